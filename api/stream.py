@@ -1,20 +1,23 @@
 from dotenv import load_dotenv
-import os, json, logging
+import os, re, json, logging
+import orjson
 from pathlib import Path
 from fastapi import FastAPI, Query, BackgroundTasks, File, UploadFile, HTTPException, Request, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import traceback
 import requests
 from database.db import SessionLocal
 from database.models import User, Follow, FollowRequest, Notification, Report, Block, Outfit, OutfitProduct, UserProgress, OutfitTryOnSignup, UserOutfit, Brand, UserBrand
-from utils.redis_client import r
+from utils.redis_client import r, r_raw, warm_pool, login_lookup_key, invalidate_login_lookup
+from utils.session_store import session_key, load_session, delete_session
 from aioapns import APNs, NotificationRequest
 from datetime import datetime
 from api.cv_test_endpoint import router as cv_test_router
 import base64
 import httpx
+from anthropic import AsyncAnthropic
 from vertexai.preview.vision_models import Image, ImageGenerationModel
 
 # Load .env from the root directory
@@ -30,11 +33,40 @@ logger = logging.getLogger(__name__)
 # Agent/LLM models removed - no longer using conversational endpoints
 
 # --- FastAPI app + SSE streaming endpoint ---
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Include CV test endpoints
 app.include_router(cv_test_router)
 
+# Shared Anthropic client for streaming endpoints - keeps TLS connections alive across requests
+async_anthropic_client = AsyncAnthropic(
+    api_key=os.getenv("ANTHROPIC_API_KEY"),
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+)
+
+
+# Matches the READY_TO_POST JSON block the caption assistant emits when it's done
+CAPTION_JSON_BLOCK = re.compile(r'\{.*"READY_TO_POST".*\}', re.S)
+
+
+@app.on_event("startup")
+def warm_redis_pool():
+    """Open the shared Redis pool's connections before the first request needs them."""
+    try:
+        warm_pool()
+    except Exception as e:
+        # Not fatal: connections are still opened lazily on first use
+        logger.warning(f"⚠️ Could not pre-warm Redis pool: {e}")
+
+
+@app.on_event("shutdown")
+async def close_anthropic_client():
+    """Close the shared Anthropic HTTP connection pool on shutdown."""
+    await async_anthropic_client.close()
+
 apns = APNs(
       key='/home/ec2-user/keys/AuthKey_2JXWNB9AAR.p8',
       key_id='2JXWNB9AAR',  # This is from your filename
@@ -90,7 +122,7 @@ async def send_verification_code(request: VerificationCodeRequest):
         email = request.email
 
         # Generate 6-digit verification code
-        verification_code = secrets.randbelow(900000) + 100000
+        verification_code = 100000 + int.from_bytes(secrets.token_bytes(4), "big") % 900000
 
         # Email configuration
         EMAIL_USER = os.getenv("EMAIL_USER")
@@ -308,6 +340,8 @@ async def simple_signup(request: SimpleSignupRequest):
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
+        # A login tried just before signup may have cached "no such user"
+        invalidate_login_lookup(request.username, request.email)
 
         logger.info(f"✅ Created user {user_id} (@{request.username})")
 
@@ -452,13 +486,14 @@ async def poll_user_id(session_id: str):
     Returns user_id if available, or status if still processing.
     """
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
+        # Only the top-level session hash: the signup/login sections aren't needed here.
+        # Its values are JSON (first_group can be sizeable), read as bytes for orjson.
+        session_data = r_raw.hgetall(session_key(session_id))
 
-        if not session_data_str:
+        if not session_data:
             return {"status": "not_found", "message": "Session not found"}
 
-        session_data = json.loads(session_data_str)
+        session_data = {name.decode(): orjson.loads(value) for name, value in session_data.items()}
         user_id = session_data.get("user_id")
 
         if user_id:
@@ -496,18 +531,18 @@ async def cleanup_session(session_id: str):
 
     try:
         # 1. Check if Redis session exists and get metadata
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
+        session_data = load_session(session_id)
 
-        if not session_data_str:
+        if not session_data:
             logger.warning(f"⚠️  Session {session_id} not found in Redis")
             return {"status": "not_found", "session_id": session_id}
 
-        session_data = json.loads(session_data_str)
         conversations_saved = session_data.get('conversations_saved', False)
 
-        # 2. Delete Redis session
-        r.delete(redis_key)
+        # 2. Delete Redis session (UNLINK frees it in the background on the Redis side),
+        #    plus the cached login lookup for this user if they logged in
+        login_username = session_data['login_data'].get('username')
+        delete_session(session_id, *([login_lookup_key(login_username)] if login_username else []))
         logger.info(f"🗑️  Deleted Redis session {session_id}")
 
         # 3. Delete SQLite checkpoints (if conversations were saved)
@@ -559,8 +594,8 @@ async def get_latest_session():
     Useful for Postman testing.
     """
     try:
-        # Get all session keys
-        keys = r.keys("session:*")
+        # Get all session keys (the top-level hash of each; sections have a ":suffix")
+        keys = [key for key in r.keys("session:*") if key.count(":") == 1]
 
         if not keys:
             return {
@@ -570,17 +605,14 @@ async def get_latest_session():
 
         # Get the most recent one (first in list)
         latest_key = keys[0].decode() if isinstance(keys[0], bytes) else keys[0]
-        session_data_str = r.get(latest_key)
+        session_data = load_session(latest_key.replace("session:", ""))
 
-        if not session_data_str:
+        if not session_data:
             return {
                 "status": "error",
                 "message": "Session key exists but no data found"
             }
 
-        # Parse the session data
-        session_data = json.loads(session_data_str)
-
         return {
             "status": "success",
             "session_id": latest_key.replace("session:", ""),
@@ -1750,7 +1782,8 @@ async def send_follow_request(request_data: FollowRequestCreate):
             era_notification = Notification(
                 user_id=request_data.requested_id,
                 actor_id=request_data.requester_id,
-                content=f"{requester_name} started following you"
+                content=f"{requester_name} started following you",
+                notification_type="new_follower"
             )
             db.add(era_notification)
             db.commit()
@@ -1813,7 +1846,8 @@ async def send_follow_request(request_data: FollowRequestCreate):
             era_notification = Notification(
                 user_id=request_data.requested_id,  # Notification belongs to User B
                 actor_id=request_data.requester_id,  # The requester is the actor
-                content=f"{requester_name} wants to follow you"
+                content=f"{requester_name} wants to follow you",
+                notification_type="follow_request"
             )
             db.add(era_notification)
             db.commit()
@@ -2021,7 +2055,8 @@ Return ONLY the text, no quotes."""
         era_notification = Notification(
             user_id=request_data.requester_id,  # Notification belongs to User A
             actor_id=request_data.requested_id,  # The accepter is the actor
-            content=notification_message
+            content=notification_message,
+            notification_type="follow_accept"
         )
         db.add(era_notification)
         db.commit()
@@ -2638,8 +2673,15 @@ async def get_profile(viewer_id: str, profile_id: str):
     """
     db = SessionLocal()
     try:
-        # Get the profile user
-        profile_user = db.query(User).filter(User.id == profile_id).first()
+        # Get the profile user - only the columns the response uses
+        profile_user = db.query(
+            User.id,
+            User.username,
+            User.name,
+            User.university,
+            User.occupation,
+            User.is_private
+        ).filter(User.id == profile_id).first()
 
         if not profile_user:
             return {
@@ -2819,21 +2861,23 @@ async def get_notifications(user_id: str):
     try:
         # Get user's own notifications (follow requests and accepts ONLY)
         feed_items = []
-        user_notifications = db.query(Notification).filter(
+        # One query: notifications LEFT JOIN their actor's display fields
+        user_notifications = db.query(
+            Notification,
+            User.id,
+            User.username,
+            User.name,
+            User.profile_image
+        ).outerjoin(
+            User, User.id == Notification.actor_id
+        ).filter(
             Notification.user_id == user_id
         ).order_by(Notification.created_at.asc()).all()
 
-        for notif in user_notifications:
-            # Determine notification type based on content
-            if "wants to follow you" in notif.content:
-                notif_type = "follow_request"
-            elif "accepted your follow request" in notif.content:
-                notif_type = "follow_accept"
-            elif "started following you" in notif.content:
-                notif_type = "new_follower"
-            elif "posted" in notif.content:
-                notif_type = "new_post"
-            else:
+        for notif, actor_id, actor_username, actor_name, actor_profile_image in user_notifications:
+            # Notification type is stored when the notification is created
+            notif_type = notif.notification_type
+            if not notif_type:
                 # Skip anything that's not a recognized notification type
                 continue
 
@@ -2843,19 +2887,18 @@ async def get_notifications(user_id: str):
                 "type": notif_type,
                 "user_id": notif.user_id,
                 "content": notif.content,
+                "is_read": notif.is_read,
                 "created_at": notif.created_at.isoformat()
             }
 
-            # ALWAYS get and add actor details if actor_id exists
+            # ALWAYS add actor details if actor_id exists
             if notif.actor_id:
-                actor = db.query(User).filter(User.id == notif.actor_id).first()
-                if actor:
+                if actor_id:
                     # Add actor fields directly to notification_item
-                    notification_item["actor_id"] = actor.id
-                    notification_item["actor_username"] = actor.username
-                    notification_item["actor_name"] = actor.name
-                    notification_item["actor_profile_image"] = actor.profile_image
-                    logger.info(f"✅ Added actor info for notification {notif.id}: {actor.username}")
+                    notification_item["actor_id"] = actor_id
+                    notification_item["actor_username"] = actor_username
+                    notification_item["actor_name"] = actor_name
+                    notification_item["actor_profile_image"] = actor_profile_image
                 else:
                     logger.warning(f"⚠️  Actor not found for actor_id: {notif.actor_id}")
             else:
@@ -2863,8 +2906,7 @@ async def get_notifications(user_id: str):
 
             feed_items.append(notification_item)
 
-        # Sort all items by created_at (oldest to newest - bottom is newest)
-        feed_items.sort(key=lambda x: x["created_at"])
+        # feed_items is already oldest to newest (bottom is newest) from the ORDER BY above
 
         return {
             "status": "success",
@@ -2883,46 +2925,57 @@ async def get_notifications(user_id: str):
         db.close()
 
 
-@app.get("/caption/stream")
-async def caption_generation_stream(q: str = Query(""), session_id: str = Query(...)):
+class MarkNotificationsReadRequest(BaseModel):
+    notification_ids: List[str]
+
+
+@app.post("/notifications/{user_id}/mark_read")
+async def mark_notifications_read(user_id: str, request_data: MarkNotificationsReadRequest):
     """
-    SSE streaming endpoint for AI-assisted caption generation.
+    Mark a batch of notifications as read in a single UPDATE.
 
-    Query params:
-    - q: user message
-    - session_id: unique session identifier (required)
+    Request body:
+    {
+        "notification_ids": ["notif_id_1", "notif_id_2", ...]
+    }
 
-    The AI will chat with the user to understand what they want to post,
-    then generate 2 captions and a
-     location. When ready, sends conversation_complete event.
+    Only notifications belonging to user_id are updated.
     """
-    async def event_gen():
-        import json
-        from utils.redis_client import r
-        from anthropic import Anthropic
+    if not request_data.notification_ids:
+        return {
+            "status": "success",
+            "updated": 0
+        }
 
-        # Get or initialize caption session in Redis
-        redis_key = f"caption_session:{session_id}"
-        session_data_str = r.get(redis_key)
+    db = SessionLocal()
+    try:
+        updated = db.query(Notification).filter(
+            Notification.user_id == user_id,
+            Notification.id.in_(request_data.notification_ids)
+        ).update({Notification.is_read: True}, synchronize_session=False)
+        db.commit()
 
-        if session_data_str:
-            session_data = json.loads(session_data_str)
-        else:
-            # Initialize new caption session
-            session_data = {
-                "messages": [],
-                "caption_data": {}
-            }
+        logger.info(f"✅ Marked {updated} notifications read for {user_id}")
 
-        # Add user message to conversation history
-        if q:
-            session_data["messages"].append({"role": "user", "content": q})
+        return {
+            "status": "success",
+            "updated": updated
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error marking notifications read for {user_id}: {e}")
+        return {
+            "status": "error",
+            "error": str(e)
+        }
+    finally:
+        db.close()
 
-        # Build conversation for Anthropic
-        conversation_messages = session_data["messages"].copy()
 
-        # System prompt
-        system_prompt = """You are a creative assistant helping users craft the perfect social media post.
+# System prompt for caption generation. Kept at module scope so the exact same text is sent
+# on every request - required for Anthropic prompt caching to hit.
+CAPTION_SYSTEM_PROMPT = """You are a creative assistant helping users craft the perfect social media post.
 
 Your job:
 1. Chat with the user to understand what they want to post about
@@ -2959,10 +3012,39 @@ Examples of when to generate:
 - User: "yeah i'm ready to post!" → generate with info you collected
 - User: "girlboss energy post about my new job" → generate empowering career captions"""
 
-        try:
-            # Call Anthropic API
-            client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Ephemeral prompt-cache marker for Anthropic content blocks
+ANTHROPIC_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+@app.get("/caption/stream")
+async def caption_generation_stream(q: str = Query(""), session_id: str = Query(...)):
+    """
+    SSE streaming endpoint for AI-assisted caption generation.
+
+    Query params:
+    - q: user message
+    - session_id: unique session identifier (required)
 
+    The AI will chat with the user to understand what they want to post,
+    then generate 2 captions and a
+     location. When ready, sends conversation_complete event.
+    """
+    async def event_gen():
+        # Caption session lives in Redis as an append-only message list + a caption_data hash
+        messages_key = f"caption_session:{session_id}:messages"
+        data_key = f"caption_session:{session_id}:data"
+
+        # Append user message and read the full history in one round-trip
+        pipe = r.pipeline()
+        if q:
+            pipe.rpush(messages_key, orjson.dumps({"role": "user", "content": q}))
+        pipe.lrange(messages_key, 0, -1)
+        stored_messages = pipe.execute()[-1]
+
+        # Build conversation for Anthropic
+        conversation_messages = [orjson.loads(msg) for msg in stored_messages]
+
+        try:
             # Build messages for Claude
             messages_for_claude = []
             for msg in conversation_messages:
@@ -2971,10 +3053,24 @@ Examples of when to generate:
                     "content": msg["content"]
                 })
 
-            response = client.messages.create(
+            # Mark the latest turn as a cache breakpoint so earlier turns are served
+            # from Anthropic's prompt cache on the next request
+            if messages_for_claude:
+                messages_for_claude[-1]["content"] = [{
+                    "type": "text",
+                    "text": messages_for_claude[-1]["content"],
+                    "cache_control": ANTHROPIC_CACHE_CONTROL
+                }]
+
+            # Call Anthropic API (shared client reuses pooled connections)
+            response = await async_anthropic_client.messages.create(
                 model="claude-sonnet-4-20250514",
                 max_tokens=500,
-                system=system_prompt,
+                system=[{
+                    "type": "text",
+                    "text": CAPTION_SYSTEM_PROMPT,
+                    "cache_control": ANTHROPIC_CACHE_CONTROL
+                }],
                 messages=messages_for_claude,
                 stream=True
             )
@@ -2983,58 +3079,56 @@ Examples of when to generate:
             ready_to_post = False
 
             # Stream the response
-            for chunk in response:
+            async for chunk in response:
                 if chunk.type == "content_block_delta":
                     if hasattr(chunk.delta, "text"):
                         text = chunk.delta.text
                         assistant_response += text
 
                         # Stream token to frontend
-                        yield f"event: token\ndata: {json.dumps({'content': text})}\n\n"
+                        yield b"event: token\ndata: " + orjson.dumps({"content": text}) + b"\n\n"
 
-            # Save assistant response to conversation history
-            session_data["messages"].append({
+            # Save assistant response to conversation history (appended with the caption data below)
+            pipe = r.pipeline()
+            pipe.rpush(messages_key, orjson.dumps({
                 "role": "assistant",
                 "content": assistant_response
-            })
+            }))
 
-            # Check if response contains the READY_TO_POST JSON
-            if "READY_TO_POST" in assistant_response:
+            # Check if response contains the READY_TO_POST JSON (cheap substring test first -
+            # most turns are just conversation and never reach the parser)
+            json_block = CAPTION_JSON_BLOCK.search(assistant_response) if '"READY_TO_POST"' in assistant_response else None
+            if json_block:
                 try:
-                    # Extract JSON from response
-                    json_start = assistant_response.find("{")
-                    json_end = assistant_response.rfind("}") + 1
-                    json_str = assistant_response[json_start:json_end]
-
-                    caption_data = json.loads(json_str)
+                    caption_data = orjson.loads(json_block.group(0))
 
                     if caption_data.get("READY_TO_POST"):
                         # Store generated content in Redis
-                        session_data["caption_data"] = {
+                        pipe.hset(data_key, mapping={
                             "caption1": caption_data.get("caption1", ""),
                             "caption2": caption_data.get("caption2", ""),
                             "location": caption_data.get("location", "")
-                        }
+                        })
 
                         ready_to_post = True
                         logger.info(f"✅ Generated captions for session {session_id}")
 
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     logger.error(f"Failed to parse caption JSON: {e}")
 
             # Save session back to Redis
-            r.set(redis_key, json.dumps(session_data))
+            pipe.execute()
 
             # If ready to post, send conversation_complete event
             if ready_to_post:
                 logger.info(f"✅ Sending conversation_complete to iOS for session {session_id}")
-                yield f"event: conversation_complete\ndata: {json.dumps({'session_id': session_id})}\n\n"
+                yield b"event: conversation_complete\ndata: " + orjson.dumps({"session_id": session_id}) + b"\n\n"
 
         except Exception as e:
             logger.error(f"Error in caption generation: {e}")
-            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            yield b"event: error\ndata: " + orjson.dumps({"error": str(e)}) + b"\n\n"
 
-        yield "event: done\ndata: {}\n\n"
+        yield b"event: done\ndata: {}\n\n"
 
     headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     return StreamingResponse(event_gen(), media_type="text/event-stream", headers=headers)
@@ -3054,15 +3148,15 @@ async def poll_caption_data(session_id: str):
     }
     """
     try:
-        redis_key = f"caption_session:{session_id}"
-        session_data_str = r.get(redis_key)
+        # Check the session exists and read caption data in one round-trip
+        pipe = r.pipeline()
+        pipe.exists(f"caption_session:{session_id}:messages")
+        pipe.hgetall(f"caption_session:{session_id}:data")
+        session_exists, caption_data = pipe.execute()
 
-        if not session_data_str:
+        if not session_exists:
             return {"status": "not_found", "message": "Session not found"}
 
-        session_data = json.loads(session_data_str)
-        caption_data = session_data.get("caption_data", {})
-
         if caption_data and caption_data.get("caption1"):
             return {
                 "status": "ready",
@@ -83,6 +83,12 @@ class Notification(Base):
     # Content of the notification
     content = Column(String, nullable=False)
 
+    # Set when the notification is written: "follow_request", "follow_accept", "new_follower" or "new_post"
+    notification_type = Column(String(50), nullable=True)
+
+    # Whether the receiver has seen this notification
+    is_read = Column(Boolean, default=False, nullable=False)
+
     # Timestamp
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,52 @@
+"""
+Migration script to add is_read column to notifications table.
+Existing notifications are treated as unread (is_read=False).
+
+Run this script once to update your database:
+    python add_is_read_to_notifications.py
+"""
+
+from database.db import engine
+from sqlalchemy import text
+
+def add_is_read_column():
+    """Add is_read column to notifications table with default False (unread)"""
+
+    with engine.connect() as connection:
+        # Start a transaction
+        trans = connection.begin()
+
+        try:
+            # Check if column already exists
+            check_query = text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name='notifications' AND column_name='is_read'
+            """)
+            result = connection.execute(check_query)
+
+            if result.fetchone():
+                print("✅ Column 'is_read' already exists in notifications table")
+                trans.rollback()
+                return
+
+            # Add the column with default False (unread)
+            alter_query = text("""
+                ALTER TABLE notifications
+                ADD COLUMN is_read BOOLEAN NOT NULL DEFAULT FALSE
+            """)
+            connection.execute(alter_query)
+
+            # Commit the transaction
+            trans.commit()
+            print("✅ Successfully added 'is_read' column to notifications table")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"❌ Error adding column: {e}")
+            raise
+
+if __name__ == "__main__":
+    print("Starting migration to add is_read column...")
+    add_is_read_column()
+    print("Migration complete!")
@@ -0,0 +1,72 @@
+"""
+Migration script to add notification_type column to notifications table.
+Existing rows are backfilled from their content, using the same phrases
+GET /notifications used to match on:
+    'wants to follow you'          -> follow_request
+    'accepted your follow request' -> follow_accept
+    'started following you'        -> new_follower
+    'posted'                       -> new_post
+Anything else stays NULL and is not shown in the notifications feed.
+
+Run this script once to update your database:
+    python add_notification_type_column.py
+"""
+
+from database.db import engine
+from sqlalchemy import text
+
+def add_notification_type_column():
+    """Add notification_type column to notifications table and backfill existing rows"""
+
+    with engine.connect() as connection:
+        # Start a transaction
+        trans = connection.begin()
+
+        try:
+            # Check if column already exists
+            check_query = text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name='notifications' AND column_name='notification_type'
+            """)
+            result = connection.execute(check_query)
+
+            if result.fetchone():
+                print("✅ Column 'notification_type' already exists in notifications table")
+                trans.rollback()
+                return
+
+            # Add the column
+            alter_query = text("""
+                ALTER TABLE notifications
+                ADD COLUMN notification_type VARCHAR(50)
+            """)
+            connection.execute(alter_query)
+
+            # Backfill existing notifications from their content
+            backfill_query = text("""
+                UPDATE notifications
+                SET notification_type = CASE
+                    WHEN content LIKE '%wants to follow you%' THEN 'follow_request'
+                    WHEN content LIKE '%accepted your follow request%' THEN 'follow_accept'
+                    WHEN content LIKE '%started following you%' THEN 'new_follower'
+                    WHEN content LIKE '%posted%' THEN 'new_post'
+                    ELSE NULL
+                END
+            """)
+            result = connection.execute(backfill_query)
+
+            # Commit the transaction
+            trans.commit()
+            print("✅ Successfully added 'notification_type' column to notifications table")
+            print(f"   Backfilled {result.rowcount} existing notifications")
+
+        except Exception as e:
+            trans.rollback()
+            print(f"❌ Error adding column: {e}")
+            raise
+
+if __name__ == "__main__":
+    print("Starting migration to add notification_type column...")
+    add_notification_type_column()
+    print("Migration complete!")
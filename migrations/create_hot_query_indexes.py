@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes for the hot profile/notification queries.
+
+- notifications(user_id, created_at): GET /notifications/{user_id} filters by user_id
+  and orders by created_at, so the rows come back in index order without a sort. The
+  small columns the endpoint selects (notification_type included) are INCLUDEd; content
+  is left out because it is unbounded text, and a btree entry larger than ~2.7 KB makes
+  the INSERT of a long notification fail. content is read from the heap.
+- follows(follower_id, following_id) and follow_requests(requester_id, requested_id):
+  the follow-status lookups in GET /profile/{viewer_id}/{profile_id}.
+
+Indexes are built CONCURRENTLY so the tables stay writable while this runs.
+
+Run this after add_is_read_to_notifications.py and add_notification_type_column.py: the
+notifications index covers the is_read and notification_type columns, so they have to
+exist first.
+
+Usage:
+    python3 create_hot_query_indexes.py
+"""
+import os
+import sys
+from dotenv import load_dotenv
+import psycopg2
+
+# Load environment variables
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+INDEXES = [
+    ("ix_notifications_user_created", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_user_created
+        ON notifications(user_id, created_at)
+        INCLUDE (id, actor_id, is_read, notification_type);
+    """),
+    ("ix_follows_follower_following", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_follows_follower_following
+        ON follows(follower_id, following_id);
+    """),
+    ("ix_follow_requests_requester_requested", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_follow_requests_requester_requested
+        ON follow_requests(requester_id, requested_id);
+    """),
+]
+
+def create_hot_query_indexes():
+    """Create the composite indexes used by the profile and notification endpoints"""
+
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL not found in environment")
+        sys.exit(1)
+
+    try:
+        # Connect to database - CREATE INDEX CONCURRENTLY can't run inside a transaction
+        conn = psycopg2.connect(DATABASE_URL)
+        conn.autocommit = True
+        cur = conn.cursor()
+
+        for index_name, create_sql in INDEXES:
+            print(f"🔄 Creating index {index_name}...")
+            cur.execute(create_sql)
+            print(f"✅ Index {index_name} ready")
+
+        cur.close()
+        conn.close()
+
+        print("\n🎉 Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"❌ Database error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Hot Query Indexes Migration")
+    print("=" * 50)
+    create_hot_query_indexes()
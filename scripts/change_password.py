@@ -7,6 +7,12 @@ import sys
 import bcrypt
 from dotenv import load_dotenv
 import psycopg2
+from pathlib import Path
+
+# Add parent directory to path so utils can be imported when run directly
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.redis_client import invalidate_login_lookup
 
 # Load environment variables
 load_dotenv()
@@ -26,7 +32,7 @@ def change_password(username: str, new_password: str):
 
     try:
         # Find user
-        cur.execute("SELECT id, username FROM users WHERE username = %s", (username,))
+        cur.execute("SELECT id, username, email FROM users WHERE username = %s", (username,))
         user = cur.fetchone()
 
         if not user:
@@ -35,7 +41,7 @@ def change_password(username: str, new_password: str):
             conn.close()
             sys.exit(1)
 
-        user_id, user_username = user
+        user_id, user_username, user_email = user
         print(f"✅ Found user: {user_username} (ID: {user_id})")
 
         # Hash the new password
@@ -47,6 +53,8 @@ def change_password(username: str, new_password: str):
         # Update password
         cur.execute("UPDATE users SET password = %s WHERE username = %s", (hashed_password, username))
         conn.commit()
+        # Logins cache the password hash briefly; drop it so the old password stops working now
+        invalidate_login_lookup(user_username, user_email)
 
         print(f"✅ Password updated for user '{username}'")
 
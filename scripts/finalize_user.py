@@ -2,12 +2,12 @@
 Finalization tools for user onboarding.
 Handles verification, saving Redis data to Postgres, and conversation migration.
 """
-import json
 import logging
 from datetime import datetime
 from typing import Optional
 from langchain_core.tools import tool
-from utils.redis_client import r
+from utils.redis_client import r, invalidate_login_lookup
+from utils.session_store import session_key, update_session
 from database.db import SessionLocal
 from database.models import User
 from utils.jwt_utils import create_token_pair
@@ -28,16 +28,12 @@ def save_redis_to_postgres(session_id: str) -> int:
     """
     db = SessionLocal()
     try:
-        # Get Redis data (using session: key format to match tools.py)
-        redis_key = f"session:{session_id}"
-        session_json = r.get(redis_key)
+        # Get the signup fields Redis collected (the session's signup hash, see session_store)
+        user_data = r.hgetall(session_key(session_id, "signup_data"))
         
-        if not session_json:
+        if not user_data:
             logger.error(f"No Redis data found for session {session_id}")
             return 0
-        
-        session_data = json.loads(session_json)
-        user_data = session_data.get("signup_data", {})
         logger.info(f"Retrieved Redis data for session {session_id}")
 
         # Generate and save the current dynamic prompt state
@@ -66,6 +62,8 @@ def save_redis_to_postgres(session_id: str) -> int:
         db.commit()
         db.refresh(new_user)
         user_id = new_user.id
+        # A login tried just before signup may have cached "no such user"
+        invalidate_login_lookup(new_user.username, new_user.email)
         
         logger.info(f"✅ Saved user to Postgres with ID: {user_id}")
         return user_id
@@ -235,17 +233,8 @@ def test_verification_code(session_id: str, user_input_verification_code: int) -
         str: "incorrect" if wrong code, "verified" if correct (background tasks will handle the rest)
     """
     try:
-        # Step 1: Get stored verification code from Redis (using session: key format)
-        redis_key = f"session:{session_id}"
-        session_json = r.get(redis_key)
-        
-        if not session_json:
-            logger.error(f"No session found for {session_id}")
-            return "incorrect"
-        
-        session_data = json.loads(session_json)
-        user_data = session_data.get("signup_data", {})
-        stored_code = user_data.get("verificationCodeGenerated")  # tools.py uses this field name
+        # Step 1: Get stored verification code from the session's signup hash
+        stored_code = r.hget(session_key(session_id, "signup_data"), "verificationCodeGenerated")  # tools.py uses this field name
         
         if not stored_code:
             logger.error(f"No verification code found for session {session_id}")
@@ -255,15 +244,13 @@ def test_verification_code(session_id: str, user_input_verification_code: int) -
         if int(stored_code) != int(user_input_verification_code):
             logger.info(f"❌ Verification failed for session {session_id}")
             # Mark that verification was attempted
-            session_data["signup_data"]["last_verification_attempt"] = "failed"
-            r.set(redis_key, json.dumps(session_data))
+            update_session(session_id, {"signup_data": {"last_verification_attempt": "failed"}})
             return "incorrect"
         
         logger.info(f"✅ Verification code matched for session {session_id}")
         
         # Step 3: Mark as verified (background tasks will be triggered)
-        session_data["signup_data"]["verification_status"] = "verified"
-        r.set(redis_key, json.dumps(session_data))
+        update_session(session_id, {"signup_data": {"verification_status": "verified"}})
         
         # Return verified - background tasks will be triggered by the stream endpoint
         return "verified"
@@ -317,13 +304,12 @@ def finalize_user_background(session_id: str) -> int:
 
         # Step 5: Store user_id and tokens in the SAME Redis session key
         # iOS will poll this key to get the user_id and tokens, then delete it (along with SQLite)
-        redis_key = f"session:{session_id}"
-        session_data = json.loads(r.get(redis_key) or '{}')
-        session_data['user_id'] = user_id
-        session_data['access_token'] = access_token
-        session_data['refresh_token'] = refresh_token
-        session_data['conversations_saved'] = conversations_saved  # Track if we should clean SQLite
-        r.setex(redis_key, 300, json.dumps(session_data))  # 5 min TTL for iOS to poll
+        update_session(session_id, {None: {
+            'user_id': user_id,
+            'access_token': access_token,
+            'refresh_token': refresh_token,
+            'conversations_saved': conversations_saved,  # Track if we should clean SQLite
+        }}, ttl=300)  # 5 min TTL for iOS to poll
         logger.info(f"💾 Stored user_id {user_id} and tokens in Redis session {session_id}")
 
         # Note: SQLite cleanup will happen when iOS calls /cleanup endpoint
@@ -6,6 +6,7 @@ HTTP client for calling the separate CV service
 import httpx
 import os
 import logging
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 import base64
 
@@ -14,13 +15,16 @@ logger = logging.getLogger(__name__)
 # CV Service URL from environment variable
 CV_SERVICE_URL = os.getenv("CV_SERVICE_URL", "http://localhost:8001")
 
+# Keep-alive pool so repeated CV calls reuse TCP/TLS connections
+CV_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20)
+
 
 class CVServiceClient:
     """Client for interacting with the CV service"""
 
     def __init__(self, base_url: str = None):
         self.base_url = base_url or CV_SERVICE_URL
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.client = httpx.AsyncClient(timeout=30.0, limits=CV_HTTP_LIMITS)
 
     async def health_check(self) -> bool:
         """Check if CV service is healthy"""
@@ -149,13 +153,7 @@ class CVServiceClient:
         await self.client.aclose()
 
 
-# Singleton instance
-_cv_client = None
-
-
+@lru_cache(maxsize=None)
 def get_cv_client() -> CVServiceClient:
-    """Get or create CV client singleton"""
-    global _cv_client
-    if _cv_client is None:
-        _cv_client = CVServiceClient()
-    return _cv_client
+    """Get or create CV client singleton (one shared HTTP connection pool per process)"""
+    return CVServiceClient()
@@ -139,6 +139,9 @@ async def main():
         print("\n" + "💡 TIP: Provide an outfit image to test detection:")
         print("   python test_cv_integration.py path/to/outfit.jpg")
 
+    # All tests share one client/connection pool - close it once at the end
+    await get_cv_client().close()
+
     # Summary
     print("\n" + "="*50)
     print("SUMMARY")
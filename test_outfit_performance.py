@@ -1,95 +1,119 @@
 #!/usr/bin/env python3
 """
 Test Outfit Retrieval Performance
-Measures how long it takes to fetch 1, 4, and 10 outfits
+Measures how long it takes to fetch 1, 4, and 10 outfits when many
+requests hit the backend at the same time (exercises server pooling/concurrency)
 """
 
-import requests
+import asyncio
+import statistics
 import time
-import json
+
+import httpx
 
 # Your backend URL
 BACKEND_URL = "http://your-ec2-ip:8000"  # ← Change this!
 TEST_USER_ID = "performance_test_user"
+CONCURRENT_REQUESTS = 20  # Requests fired at once per test
 
 
-def test_outfit_retrieval(count: int):
-    """Test fetching N outfits and measure time"""
-    print(f"\n{'='*60}")
-    print(f"Testing: Fetch {count} outfit(s)")
-    print('='*60)
-
-    start_time = time.time()
-
+async def timed_get(client: httpx.AsyncClient, count: int):
+    """Fetch N outfits once and return (duration, response or exception)"""
+    start_time = time.perf_counter()
     try:
-        response = requests.get(
-            f"{BACKEND_URL}/outfits/next",
+        response = await client.get(
+            "/outfits/next",
             params={
                 "user_id": TEST_USER_ID,
                 "count": count
-            },
-            timeout=60
+            }
         )
+        return time.perf_counter() - start_time, response
+    except Exception as e:
+        return time.perf_counter() - start_time, e
 
-        end_time = time.time()
-        duration = end_time - start_time
-
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✅ SUCCESS")
-            print(f"   Time: {duration:.2f}s ({duration*1000:.0f}ms)")
-            print(f"   Outfits returned: {len(data)}")
-
-            # Show first outfit as sample
-            if data:
-                first = data[0]
-                print(f"\n   Sample outfit:")
-                print(f"   - Title: {first.get('title', 'N/A')}")
-                print(f"   - Products: {len(first.get('products', []))}")
-                print(f"   - Image: {first.get('image_url', 'N/A')[:50]}...")
-
-            return {
-                "count": count,
-                "duration": duration,
-                "success": True,
-                "outfits_returned": len(data)
-            }
-        else:
-            print(f"❌ FAILED")
-            print(f"   Status: {response.status_code}")
-            print(f"   Error: {response.text[:200]}")
-            return {
-                "count": count,
-                "duration": duration,
-                "success": False,
-                "error": response.text[:200]
-            }
 
-    except Exception as e:
-        end_time = time.time()
-        duration = end_time - start_time
-        print(f"❌ ERROR: {e}")
+async def test_outfit_retrieval(client: httpx.AsyncClient, count: int):
+    """Fire CONCURRENT_REQUESTS requests for N outfits at once and measure latency"""
+    print(f"\n{'='*60}")
+    print(f"Testing: Fetch {count} outfit(s) x {CONCURRENT_REQUESTS} concurrent requests")
+    print('='*60)
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*[timed_get(client, count) for _ in range(CONCURRENT_REQUESTS)])
+    wall_time = time.perf_counter() - start_time
+
+    durations = [duration for duration, response in results
+                 if isinstance(response, httpx.Response) and response.status_code == 200]
+    errors = [response for _, response in results
+              if not (isinstance(response, httpx.Response) and response.status_code == 200)]
+
+    if not durations:
+        first_error = errors[0]
+        if isinstance(first_error, httpx.Response):
+            error = f"Status {first_error.status_code}: {first_error.text[:200]}"
+        else:
+            error = str(first_error)
+        print(f"❌ FAILED")
+        print(f"   Error: {error}")
         return {
             "count": count,
-            "duration": duration,
             "success": False,
-            "error": str(e)
+            "error": error
         }
 
-
-def main():
+    # p50 / p95 over per-request wall times (quantiles needs at least 2 points)
+    if len(durations) > 1:
+        percentiles = statistics.quantiles(durations, n=100)
+        p50, p95 = percentiles[49], percentiles[94]
+    else:
+        p50 = p95 = durations[0]
+
+    data = next(response for _, response in results
+                if isinstance(response, httpx.Response) and response.status_code == 200).json()
+
+    print(f"✅ SUCCESS ({len(durations)}/{CONCURRENT_REQUESTS} requests)")
+    print(f"   Wall time: {wall_time:.2f}s ({wall_time*1000:.0f}ms)")
+    print(f"   p50: {p50*1000:.0f}ms   p95: {p95*1000:.0f}ms")
+    print(f"   Outfits returned: {len(data)}")
+
+    # Show first outfit as sample
+    if data:
+        first = data[0]
+        print(f"\n   Sample outfit:")
+        print(f"   - Title: {first.get('title', 'N/A')}")
+        print(f"   - Products: {len(first.get('products', []))}")
+        print(f"   - Image: {first.get('image_url', 'N/A')[:50]}...")
+
+    if errors:
+        print(f"   ⚠️ {len(errors)} request(s) failed")
+
+    return {
+        "count": count,
+        "success": True,
+        "p50": p50,
+        "p95": p95,
+        "wall_time": wall_time,
+        "failed_requests": len(errors),
+        "outfits_returned": len(data)
+    }
+
+
+async def main():
     print("\n🎯 OUTFIT RETRIEVAL PERFORMANCE TEST")
     print(f"Backend: {BACKEND_URL}")
     print(f"User ID: {TEST_USER_ID}")
+    print(f"Concurrency: {CONCURRENT_REQUESTS}")
 
     # Test different counts
     test_counts = [1, 4, 10]
     results = []
 
-    for count in test_counts:
-        result = test_outfit_retrieval(count)
-        results.append(result)
-        time.sleep(1)  # Brief pause between tests
+    async with httpx.AsyncClient(base_url=BACKEND_URL, timeout=60) as client:
+        for count in test_counts:
+            result = await test_outfit_retrieval(client, count)
+            results.append(result)
+            await asyncio.sleep(1)  # Brief pause between tests
 
     # Summary
     print("\n" + "="*60)
@@ -100,17 +124,17 @@ def main():
 
     if successful:
         print("\n📊 Performance Results:")
-        print(f"{'Count':<10} {'Time':<15} {'Avg per outfit':<20}")
-        print("-" * 45)
+        print(f"{'Count':<10} {'p50':<12} {'p95':<12} {'Wall time':<12}")
+        print("-" * 46)
 
         for r in successful:
-            avg_per_outfit = r['duration'] / r['outfits_returned'] if r['outfits_returned'] > 0 else 0
-            print(f"{r['count']:<10} {r['duration']:.2f}s ({r['duration']*1000:.0f}ms)     {avg_per_outfit:.2f}s ({avg_per_outfit*1000:.0f}ms) per outfit")
+            print(f"{r['count']:<10} {r['p50']*1000:<12.0f} {r['p95']*1000:<12.0f} {r['wall_time']*1000:<12.0f}  (ms)")
 
         print("\n💡 Notes:")
         print("- First call may be slower (CV service warmup)")
         print("- Subsequent calls use cached products (faster)")
         print("- CV detection + Pinecone search happens in background")
+        print("- p95 climbing far above p50 usually means the server's DB/HTTP pools are saturated")
 
     else:
         print("\n⚠️ All tests failed. Check:")
@@ -127,4 +151,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -337,7 +337,8 @@ Return ONLY the sentence, no quotes, no explanation."""
                         post_notification = Notification(
                             user_id=follower_id,  # Notification belongs to the follower
                             actor_id=user_id,  # The poster is the actor
-                            content=notification_content
+                            content=notification_content,
+                            notification_type="new_post"
                         )
                         db.add(post_notification)
                         db.commit()
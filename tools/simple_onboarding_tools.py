@@ -4,8 +4,8 @@ Collects: name, username, password, confirm password, ethnicity, city, occupatio
 """
 
 from langchain_core.tools import tool
-from utils.redis_client import r
-import json
+from utils.redis_client import invalidate_login_lookup
+from utils.session_store import session_exists, load_session, update_session
 import logging
 import bcrypt
 
@@ -16,15 +16,10 @@ logger = logging.getLogger(__name__)
 def set_simple_name(session_id: str, name: str) -> str:
     """Set the user's first name in Redis."""
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
-
-        if not session_data_str:
+        if not session_exists(session_id):
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
-        session_data['signup_data']['name'] = name
-        r.set(redis_key, json.dumps(session_data))
+        update_session(session_id, {"signup_data": {"name": name}})
 
         logger.info(f"✅ Set name: {name}")
         return f"Got it! Your name is {name}."
@@ -37,15 +32,10 @@ def set_simple_name(session_id: str, name: str) -> str:
 def set_simple_username(session_id: str, username: str) -> str:
     """Set the username in Redis."""
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
-
-        if not session_data_str:
+        if not session_exists(session_id):
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
-        session_data['signup_data']['username'] = username
-        r.set(redis_key, json.dumps(session_data))
+        update_session(session_id, {"signup_data": {"username": username}})
 
         logger.info(f"✅ Set username: {username}")
         return f"Username @{username} saved!"
@@ -58,15 +48,10 @@ def set_simple_username(session_id: str, username: str) -> str:
 def set_simple_password(session_id: str, password: str) -> str:
     """Set the password in Redis."""
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
-
-        if not session_data_str:
+        if not session_exists(session_id):
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
-        session_data['signup_data']['password'] = password
-        r.set(redis_key, json.dumps(session_data))
+        update_session(session_id, {"signup_data": {"password": password}})
 
         logger.info(f"✅ Set password")
         return "Password saved!"
@@ -79,13 +64,11 @@ def set_simple_password(session_id: str, password: str) -> str:
 def confirm_simple_password(session_id: str, confirm_password: str) -> str:
     """Confirm the password matches."""
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
+        session_data = load_session(session_id)
 
-        if not session_data_str:
+        if not session_data:
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
         stored_password = session_data['signup_data'].get('password', '')
 
         if stored_password == confirm_password:
@@ -103,15 +86,10 @@ def confirm_simple_password(session_id: str, confirm_password: str) -> str:
 def set_ethnicity(session_id: str, ethnicity: str) -> str:
     """Set the user's ethnicity in Redis."""
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
-
-        if not session_data_str:
+        if not session_exists(session_id):
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
-        session_data['signup_data']['ethnicity'] = ethnicity
-        r.set(redis_key, json.dumps(session_data))
+        update_session(session_id, {"signup_data": {"ethnicity": ethnicity}})
 
         logger.info(f"✅ Set ethnicity: {ethnicity}")
         return f"Got it, thanks for sharing!"
@@ -124,15 +102,10 @@ def set_ethnicity(session_id: str, ethnicity: str) -> str:
 def set_city(session_id: str, city: str) -> str:
     """Set the city the user lives in."""
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
-
-        if not session_data_str:
+        if not session_exists(session_id):
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
-        session_data['signup_data']['city'] = city
-        r.set(redis_key, json.dumps(session_data))
+        update_session(session_id, {"signup_data": {"city": city}})
 
         logger.info(f"✅ Set city: {city}")
         return f"Nice! {city} is awesome."
@@ -145,15 +118,10 @@ def set_city(session_id: str, city: str) -> str:
 def set_simple_occupation(session_id: str, occupation: str) -> str:
     """Set the user's occupation in Redis."""
     try:
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
-
-        if not session_data_str:
+        if not session_exists(session_id):
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
-        session_data['signup_data']['occupation'] = occupation
-        r.set(redis_key, json.dumps(session_data))
+        update_session(session_id, {"signup_data": {"occupation": occupation}})
 
         logger.info(f"✅ Set occupation: {occupation}")
         return f"Cool! {occupation} sounds interesting."
@@ -175,14 +143,12 @@ def finalize_simple_signup(session_id: str) -> str:
         from datetime import datetime
         import bcrypt
 
-        redis_key = f"session:{session_id}"
-        session_data_str = r.get(redis_key)
+        session_data = load_session(session_id)
 
-        if not session_data_str:
+        if not session_data:
             return "Session not found"
 
-        session_data = json.loads(session_data_str)
-        signup_data = session_data.get('signup_data', {})
+        signup_data = session_data['signup_data']
 
         # Validate all required fields
         required_fields = ['name', 'username', 'email', 'password', 'ethnicity', 'city', 'occupation', 'gender']
@@ -238,6 +204,8 @@ def finalize_simple_signup(session_id: str) -> str:
             db.add(new_user)
             db.commit()
             db.refresh(new_user)
+            # A login tried just before signup may have cached "no such user"
+            invalidate_login_lookup(new_user.username, new_user.email)
 
             # Create profile embedding in Pinecone
             from services.profile_embeddings import create_user_profile_embedding
@@ -249,6 +217,9 @@ def finalize_simple_signup(session_id: str) -> str:
             access_token = create_access_token(user_id)
             refresh_token = create_refresh_token(user_id)
 
+            # Top-level session fields to store for the poll endpoint
+            finalized = {}
+
             # Generate first feed group synchronously (only 1 group)
             logger.info(f"🔄 Generating first feed for user {user_id}")
             from services.profile_embeddings import generate_ai_groups, find_users_from_ai_description
@@ -272,40 +243,40 @@ def finalize_simple_signup(session_id: str) -> str:
                     }
 
                     # Store everything in Redis
-                    session_data['user_id'] = user_id
-                    session_data['name'] = new_user.name
-                    session_data['access_token'] = access_token
-                    session_data['refresh_token'] = refresh_token
-                    session_data['feed_ready'] = True
-                    session_data['first_group'] = first_group
+                    finalized['user_id'] = user_id
+                    finalized['name'] = new_user.name
+                    finalized['access_token'] = access_token
+                    finalized['refresh_token'] = refresh_token
+                    finalized['feed_ready'] = True
+                    finalized['first_group'] = first_group
                     if profile_image_url:
-                        session_data['profile_image'] = profile_image_url
+                        finalized['profile_image'] = profile_image_url
 
                     logger.info(f"✅ First feed group generated for user {user_id}")
                 else:
                     # No feed generated, store without feed
-                    session_data['user_id'] = user_id
-                    session_data['name'] = new_user.name
-                    session_data['access_token'] = access_token
-                    session_data['refresh_token'] = refresh_token
-                    session_data['feed_ready'] = False
+                    finalized['user_id'] = user_id
+                    finalized['name'] = new_user.name
+                    finalized['access_token'] = access_token
+                    finalized['refresh_token'] = refresh_token
+                    finalized['feed_ready'] = False
                     if profile_image_url:
-                        session_data['profile_image'] = profile_image_url
+                        finalized['profile_image'] = profile_image_url
                     logger.warning(f"⚠️  No feed groups generated for user {user_id}")
 
             except Exception as feed_error:
                 # If feed generation fails, still store user data
                 logger.error(f"❌ Error generating feed: {feed_error}")
-                session_data['user_id'] = user_id
-                session_data['name'] = new_user.name
-                session_data['access_token'] = access_token
-                session_data['refresh_token'] = refresh_token
-                session_data['feed_ready'] = False
+                finalized['user_id'] = user_id
+                finalized['name'] = new_user.name
+                finalized['access_token'] = access_token
+                finalized['refresh_token'] = refresh_token
+                finalized['feed_ready'] = False
                 if profile_image_url:
-                    session_data['profile_image'] = profile_image_url
+                    finalized['profile_image'] = profile_image_url
 
-            # Save to Redis
-            r.set(redis_key, json.dumps(session_data))
+            # Save to Redis (only the new top-level fields; iOS polls for them)
+            update_session(session_id, {None: finalized})
 
             logger.info(f"✅ Created user {user_id} with username {signup_data['username']}")
             logger.info(f"🔑 Generated JWT tokens for user {user_id}")
@@ -1,8 +1,16 @@
 import requests
 import datetime
-import json, uuid
+import uuid
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from langchain_core.tools import tool
-from utils.redis_client import r
+from utils.redis_client import r, login_lookup_key
+from utils.session_store import (
+    session_key, load_session, create_session, update_session, set_field_if_absent,
+    delete_field_if_equal, delete_session,
+)
+from utils.jwt_utils import create_access_token, create_refresh_token
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from database.models import User
@@ -11,51 +19,110 @@ from dotenv import load_dotenv
 import os
 import secrets
 import smtplib
+import threading
+import logging
 from dateutil import parser
 from email.message import EmailMessage
 import bcrypt
 from email_validator import validate_email, EmailNotValidError
 
 load_dotenv()  # loads the .env file
+logger = logging.getLogger(__name__)
 TTL_SECONDS = 3600  # 1 hour, so temp signup sessions auto-expire
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS")
 
+# Outgoing email is sent off the request thread so tools return as soon as the code is stored.
+# SMTP is network-bound (the GIL is released while waiting), so threads are enough here.
+_mail_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mail")
+
+# One logged-in SMTP connection per process, reused across sends so each email doesn't pay
+# a TLS handshake + AUTH. smtplib isn't thread-safe, so all use goes through _smtp_lock.
+SMTP_MAX_SENDS_PER_CONNECTION = 50  # reconnect periodically rather than hold one forever
+_smtp_lock = threading.Lock()
+_smtp = None
+_smtp_sends = 0
+
+# Pinned so a werkzeug upgrade can't silently change the cost of set_password.
+# Must stay pbkdf2/bcrypt: verify_login_credentials only recognises those formats.
+_PASSWORD_HASH_METHOD = "pbkdf2:sha256:600000"
+
 # ========================================
 # UNIFIED SESSION HELPERS
 # ========================================
+# Sessions are stored by utils.session_store as one Redis hash per section, which the
+# poll/cleanup endpoints, finalize_user, the simple onboarding tools and the prompt manager
+# also use. Setters write only the fields they change, atomically and in one round-trip.
 def get_session_data(session_id: str) -> dict:
     """
     Safely retrieves the ENTIRE session from Redis.
-    Structure: {"messages": [...], "signup_data": {...}}
-    """
-    data = r.get(f"session:{session_id}")
-    if data:
-        session = json.loads(data)
-        code = session.get("signup_data", {}).get("verificationCodeGenerated")
-        if code:
-            print(f"📖 LOAD: session:{session_id} - Code={code}")
-        return session
-    else:
+    Structure: {...top-level fields, "signup_data": {...}, "login_data": {...}}
+    """
+    session = load_session(session_id)
+    if session is None:
         # Return default structure
-        print(f"📖 LOAD: session:{session_id} - NEW SESSION (no data)")
-        return {
-            "messages": [],
-            "signup_data": {}
-        }
-
-def save_session_data(session_id: str, session_data: dict):
-    """Save the entire session back to Redis."""
-    # DEBUG: Log verification code changes
-    code = session_data.get("signup_data", {}).get("verificationCodeGenerated")
-    if code is not None:
-        print(f"💾 SAVE: session:{session_id} - Code={code}")
-    r.setex(f"session:{session_id}", 1800, json.dumps(session_data))
+        logger.debug("📖 LOAD: session:%s - NEW SESSION (no data)", session_id)
+        return {"signup_data": {}, "login_data": {}}
+
+    code = session["signup_data"].get("verificationCodeGenerated")
+    if code:
+        logger.debug("📖 LOAD: session:%s - Code=%s", session_id, code)
+    return session
+
+def update_session_fields(session_id: str, section: Optional[str], **fields):
+    """
+    Set one or more fields of a session section atomically.
+    `section` is "signup_data", "login_data", or None for top-level session keys.
+    """
+    update_session(session_id, {section: fields})
+
+def update_signup_data(session_id: str, **fields):
+    """Set one or more signup_data fields atomically."""
+    update_session(session_id, {"signup_data": fields})
+
+def set_signup_field_if_absent(session_id: str, field: str, value):
+    """
+    Atomically set a signup_data field only if it has no value yet (HSETNX).
+    Returns the value already stored (and writes nothing), or None if `value` was stored.
+    """
+    return set_field_if_absent(session_id, "signup_data", field, value)
+
+# How each free-text signup field is cleaned before it's stored (after stripping whitespace)
+_NORMALIZE = {
+    "sexuality": str.lower,
+    "ethnicity": str.title,
+    "pronouns": str.lower,
+    "name": str.title,
+    "university": str.title,
+    "occupation": str.title,
+    "college_major": str.title,
+}
+
+def _normalize(field: str, value: str) -> str:
+    """Strip and normalize a signup field value in one call."""
+    return _NORMALIZE[field](value.strip())
+
+# Common birthday formats tried with strptime before falling back to dateutil's slower fuzzy parser
+_BIRTHDAY_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%B %d %Y", "%B %d, %Y", "%b %d %Y", "%b %d, %Y")
+
+def _parse_birthday(birthday: str) -> datetime:
+    """Parse a birthday, raising ValueError/OverflowError if no format matches."""
+    text = birthday.strip()
+    for fmt in _BIRTHDAY_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    return parser.parse(text, fuzzy=True)
+
+def _new_verification_code() -> int:
+    """Random 6-digit code (100000-999999) from a single CSPRNG draw."""
+    # 4 bytes rather than 3 keeps the modulo bias below 0.03%
+    return 100000 + int.from_bytes(secrets.token_bytes(4), "big") % 900000
 
 def get_signup_data(session_id: str) -> dict:
     """Extract just the signup_data portion."""
-    session = get_session_data(session_id)
-    return session.get("signup_data", {})
+    return r.hgetall(session_key(session_id, "signup_data"))
 
 
 
@@ -65,22 +132,10 @@ def create_redis_session(session_id: str) -> str:
     """If the user chooses to sign up, call this method with the session_id from the frontend. 
     It initializes a signup data object in Redis under the given session_id,
     allowing user signup information to be collected and stored throughout the flow."""
-    # Get existing session (might already have messages from the conversation)
-    session_data = get_session_data(session_id)
-    
-    existing_code = session_data.get("signup_data", {}).get("verificationCodeGenerated")
-    if existing_code:
-        print(f"\n⚠️  create_redis_session called but code {existing_code} already exists - NOT wiping data\n")
-    
-    # Initialize signup_data if not present
-    if not session_data.get("signup_data"):
-        session_data["signup_data"] = {}
-        print(f"\n✅ create_redis_session: Initialized empty signup_data for {session_id}\n")
-    else:
-        print(f"\n✅ create_redis_session: signup_data already exists, keeping it\n")
-    
-    # Save back to Redis
-    save_session_data(session_id, session_data)
+    # One atomic round-trip that's a no-op if the session already exists
+    if not create_session(session_id):
+        logger.debug("✅ create_redis_session: session %s already exists, keeping it", session_id)
+
     return f"Signup session initialized for {session_id}"
 
 @tool
@@ -89,9 +144,7 @@ def set_username(session_id: str, username: str) -> str:
     We use the session_id to access the user's temporary object stored in Redis, 
     and we get the username from the user input after being prompted by the bot.
     Returns a string 'Username {username} saved!' if the username gets saved."""
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["username"] = username
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, username=username)
     return f"Username {username} saved!"
 
 @tool 
@@ -100,10 +153,11 @@ def set_password(session_id: str, password: str) -> str:
     We use the session_id to access the user's temporary object stored in Redis, 
     and we get the username from the user input after being prompted by the bot.
     Returns a string 'Password saved!' if the password gets saved."""
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["desiredPassword"] = password  # Store the plain password first
-    session_data["signup_data"]["password"] = generate_password_hash(password)  # Store the hashed version
-    save_session_data(session_id, session_data)
+    update_signup_data(
+        session_id,
+        desiredPassword=password,  # Store the plain password first
+        password=generate_password_hash(password, method=_PASSWORD_HASH_METHOD)  # Store the hashed version
+    )
     return f"Password saved!"
 
 @tool 
@@ -124,8 +178,7 @@ def confirm_password(session_id: str, confirmPassword: str) -> bool:
 
     # compare the confirmPassword with the stored one
     if signup_data["desiredPassword"] == confirmPassword:
-        session_data["signup_data"]["confirmPassword"] = confirmPassword
-        save_session_data(session_id, session_data)
+        update_signup_data(session_id, confirmPassword=confirmPassword)
         return True
     else:
         return False
@@ -146,14 +199,13 @@ def get_email(session_id: str, email: str) -> str:
     """
 
     try:
-        valid = validate_email(email)
+        # Syntax + normalization only: the DNS MX lookup dominated this tool's latency
+        valid = validate_email(email, check_deliverability=False)
         normalized_email = valid.email
     except EmailNotValidError:
         return "That doesn't look like a valid email. Try again?"
 
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["email"] = normalized_email
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, email=normalized_email)
 
     return f"Email {normalized_email} saved!"
 
@@ -166,13 +218,11 @@ def get_user_birthday(session_id: str, birthday: str) -> str:
     Returns a string "birthday {birthday_date.strftime('%B %d, %Y')} saved! 🎂" if the user input is in a compatible date format. 
     """
     try:
-        birthday_date = parser.parse(birthday, fuzzy=True)
+        birthday_date = _parse_birthday(birthday)
     except Exception:
         return "couldn't read that date 😭 try something like 2003-07-12 or July 12, 2003."
 
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["birthday"] = birthday_date.date().isoformat()
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, birthday=birthday_date.date().isoformat())
 
     return f"birthday {birthday_date.strftime('%B %d, %Y')} saved! 🎂"
 
@@ -183,9 +233,7 @@ def get_user_gender(session_id: str, gender: str) -> str:
     Stores the user's gender in Redis for the signup flow. Make sure they enter a valid gender. 
     Returns "Gender '{gender}' saved!" if the gender gets saved successfully. 
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["gender"] = gender
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, gender=gender)
     return f"Gender '{gender}' saved!"
 
 
@@ -197,9 +245,7 @@ def get_user_sexuality(session_id: str, sexuality: str) -> str:
     is saved to the user's temporary signup object.
     Returns the string: "Sexuality '{sexuality}' saved!" when it gets saved successfully. 
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["sexuality"] = sexuality.strip().lower()  # normalize input
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, sexuality=_normalize("sexuality", sexuality))
     return f"Sexuality '{sexuality}' saved!"  
 
 
@@ -211,9 +257,7 @@ def get_user_ethnicity(session_id: str, ethnicity: str) -> str:
     is saved to the user's temporary signup object.
     Returns the string "Ethnicity '{ethnicity}' saved!" when the ethnicity gets successfully saved. 
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["ethnicity"] = ethnicity.strip().title()  # clean + normalize formatting
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, ethnicity=_normalize("ethnicity", ethnicity))
     return f"Ethnicity '{ethnicity}' saved!"
 
 
@@ -224,9 +268,7 @@ def get_user_pronouns(session_id: str, pronouns: str) -> str:
     Example inputs: 'she/her', 'he/him', 'they/them', etc.
     Returns the string "Pronouns '{pronouns}' saved!" when the pronounds get saved. 
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["pronouns"] = pronouns.strip().lower()
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, pronouns=_normalize("pronouns", pronouns))
     return f"Pronouns '{pronouns}' saved!"
 
 
@@ -237,9 +279,7 @@ def get_user_first_name(session_id: str, first_name: str) -> str:
     Example input: 'Archita'
     Returns the string "First name '{first_name}' saved!" when the first name gets saved successfully. 
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["name"] = first_name.strip().title()  # normalize name
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, name=_normalize("name", first_name))
     return f"First name '{first_name}' saved!"
 
 
@@ -250,9 +290,7 @@ def get_user_university(session_id: str, university: str) -> str:
     Example input: 'Cornell University'
     Returns "University '{university}' saved!" when the university gets successfully saved. 
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["university"] = university.strip().title()  # normalize formatting
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, university=_normalize("university", university))
     return f"University '{university}' saved!"
 
 @tool 
@@ -262,9 +300,7 @@ def get_user_occupation(session_id: str, occupation: str) -> str:
     Example input: 'Software Engineer' or 'Investment Banking Summer Analyst'
     Returns "Occupation '{occupation}' saved!" when the occupation gets successfully saved. 
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["occupation"] = occupation.strip().title()  # normalize formatting
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, occupation=_normalize("occupation", occupation))
     return f"Occupation '{occupation}' saved!"
 
 @tool 
@@ -274,9 +310,7 @@ def get_user_college_major(session_id: str, college_major: str):
     Example input: 'Electrical and Computer Engineering' 
     Returns "College major '{college_major}' saved!" when the college major gets successfully saved.
     """
-    session_data = get_session_data(session_id)
-    session_data["signup_data"]["college_major"] = college_major.strip().title()  # normalize formatting
-    save_session_data(session_id, session_data)
+    update_signup_data(session_id, college_major=_normalize("college_major", college_major))
     return f"College major '{college_major}' saved!"
 
 # ========================================
@@ -285,13 +319,20 @@ def get_user_college_major(session_id: str, college_major: str):
 # by app.py's save_session() function. No need for separate tools.
 # ========================================
 
+def _forget_verification_code(session_id: str, code: str):
+    """
+    Clear verificationCodeGenerated after its email failed to send, so generate_verification_code
+    can issue a new one. A different code (from a resend since) is left alone.
+    """
+    delete_field_if_equal(session_id, "signup_data", "verificationCodeGenerated", code)
+
 @tool
 def generate_verification_code(session_id: str) -> str:
     """
     Send a verification code to the user's email. 
     Only call this ONCE when the user first asks for a code.
     DO NOT call this again when the user is providing their code to verify!
-    Returns the string "verification code '{verification_code}' saved!" if the verification code is successfully sent and saved. 
+    Returns "verification code queued for sending to {email}!" once the code is saved and its email is queued.
     """
     session_data = get_session_data(session_id)
     signup_data = session_data.get("signup_data", {})
@@ -313,34 +354,27 @@ def generate_verification_code(session_id: str) -> str:
     if missing_fields:
         return f"Cannot send verification code yet. Missing required fields: {', '.join(missing_fields)}. Please collect these first."
 
-    # Check if a code already exists
-    existing_code = signup_data.get("verificationCodeGenerated")
+    #generate a verification code and store it - only if no code exists yet. The check and
+    #the write happen atomically in Redis, so two concurrent calls can't both send a code.
+    verification_code = _new_verification_code()
+    existing_code = set_signup_field_if_absent(session_id, "verificationCodeGenerated", verification_code)
     if existing_code is not None:
-        print(f"\n⚠️  WARNING: Verification code already exists: {existing_code}")
-        print(f"   NOT generating a new code. Tell user to check their email for the existing code.\n")
+        logger.debug("⚠️  Verification code already exists: %s - NOT generating a new code", existing_code)
         return f"A verification code was already sent to {email}. Please check your email!"
 
-    #generate a verification code and send it to that email. 
-    verification_code = secrets.randbelow(900000) + 100000
-    session_data["signup_data"]["verificationCodeGenerated"] = verification_code
-    save_session_data(session_id, session_data)
-
     # DEBUG: Print what we stored
-    print(f"\n📧 DEBUG GENERATE CODE:")
-    print(f"  Session ID: {session_id}")
-    print(f"  Generated code: {verification_code} (type: {type(verification_code)})")
-    print(f"  Sending to email: {email}\n")
+    logger.debug("📧 Generated code %s for session %s, sending to %s", verification_code, session_id, email)
 
     #send code via email
     subject = "hey bestie 💌 "
     body = f"bestieee ur Glow verification code is {verification_code}. now hurry before the universe catches on ur new era! <3"
 
-    try:
-        send_email(email, body, subject)
-        return f"verification code sent to {email}!"
-    except Exception as e:
-        print(f"❌ Email sending failed: {e}")
-        return f"Sorry, I couldn't send the email right now. Please check your email configuration. Error: {str(e)}"
+    # The send happens in the background; if it fails, forget the code so the user can ask again
+    send_email_in_background(
+        email, body, subject,
+        on_failure=lambda: _forget_verification_code(session_id, verification_code)
+    )
+    return f"verification code queued for sending to {email}!"
 
 @tool
 def resend_verification_code(session_id: str) -> str:
@@ -354,36 +388,71 @@ def resend_verification_code(session_id: str) -> str:
     email = signup_data.get("email")
     
     # Generate NEW code
-    verification_code = secrets.randbelow(900000) + 100000
-    session_data["signup_data"]["verificationCodeGenerated"] = verification_code
-    save_session_data(session_id, session_data)
+    verification_code = _new_verification_code()
+    update_signup_data(session_id, verificationCodeGenerated=verification_code)
     
-    print(f"\n🔄 RESENDING NEW CODE:")
-    print(f"  Session ID: {session_id}")
-    print(f"  New code: {verification_code}")
-    print(f"  Sending to email: {email}\n")
+    logger.debug("🔄 Resending new code %s for session %s to %s", verification_code, session_id, email)
     
     # Send new code via email
     subject = "hey bestie 💌 "
     body = f"here's your new Glow verification code: {verification_code}. the old one won't work anymore!"
 
-    try:
-        send_email(email, body, subject)
-        return f"New verification code sent to {email}!"
-    except Exception as e:
-        print(f"❌ Email sending failed: {e}")
-        return f"Sorry, I couldn't send the email right now. Please check your email configuration. Error: {str(e)}"
+    send_email_in_background(
+        email, body, subject,
+        on_failure=lambda: _forget_verification_code(session_id, verification_code)
+    )
+    return f"New verification code queued for sending to {email}!"
 
 def is_valid_email(email):
     try:
         # validate and normalize the email
-        valid = validate_email(email)
+        valid = validate_email(email, check_deliverability=False)
         return valid.email  # returns normalized email (e.g. lowercase)
     except EmailNotValidError as e:
         return None  # invalid email
 
 
+def _close_smtp():
+    """Drop the cached SMTP connection (caller holds _smtp_lock)."""
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except Exception:
+            pass
+    _smtp = None
+
+
+def _get_smtp():
+    """Return the cached SMTP connection, reconnecting if it's dead or has been used enough (caller holds _smtp_lock)."""
+    global _smtp, _smtp_sends
+    if _smtp is not None and _smtp_sends < SMTP_MAX_SENDS_PER_CONNECTION:
+        try:
+            if _smtp.noop()[0] == 250:
+                return _smtp
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    # connect to Gmail’s SMTP server
+    _close_smtp()
+    connection = smtplib.SMTP_SSL("smtp.gmail.com", 465)
+    try:
+        connection.login(EMAIL_USER, EMAIL_PASS)
+    except Exception:
+        # Never cache a connection that isn't logged in - the next send would reuse it
+        try:
+            connection.close()
+        except Exception:
+            pass
+        raise
+    _smtp = connection
+    _smtp_sends = 0
+    return _smtp
+
+
 def send_email(to_email, body, subject="hey bestie 💌"):
+    global _smtp_sends
+
     # create email object
     msg = EmailMessage()
     msg["From"] = EMAIL_USER
@@ -391,10 +460,34 @@ def send_email(to_email, body, subject="hey bestie 💌"):
     msg["Subject"] = subject
     msg.set_content(body)
 
-    # connect to Gmail’s SMTP server
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(EMAIL_USER, EMAIL_PASS)
-        smtp.send_message(msg)
+    with _smtp_lock:
+        try:
+            _get_smtp().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped us between the health check and the send - retry once on a fresh connection
+            _close_smtp()
+            _get_smtp().send_message(msg)
+        _smtp_sends += 1
+
+
+def _log_email_result(future):
+    if future.exception():
+        logger.error("❌ Email sending failed: %s", future.exception())
+
+
+def send_email_in_background(to_email, body, subject="hey bestie 💌", on_failure=None):
+    """
+    Queue send_email on the mail pool and return immediately. Failures are logged, and
+    on_failure() (if given) is called from the mail thread when the send fails.
+    """
+    future = _mail_pool.submit(send_email, to_email, body, subject)
+    future.add_done_callback(_log_email_result)
+    if on_failure is not None:
+        def call_on_failure(future):
+            if future.exception() is not None:
+                on_failure()
+        future.add_done_callback(call_on_failure)
+    return future
 
 
 @tool
@@ -413,11 +506,8 @@ def switch_to_login_mode(session_id: str) -> str:
     Call this when user wants to log in instead of sign up.
     This switches the conversation to login mode.
     """
-    session_data = get_session_data(session_id)
-    session_data["is_login"] = True
-    session_data["login_data"] = {}
-    save_session_data(session_id, session_data)
-    print(f"✅ Switched to login mode for session {session_id}")
+    update_session(session_id, {None: {"is_login": True}}, clear=("login_data",))
+    logger.debug("✅ Switched to login mode for session %s", session_id)
     return "Switched to login mode. Now ask for their username or email."
 
 @tool
@@ -430,16 +520,9 @@ def get_login_username(session_id: str, username: str) -> str:
         session_id: The session ID
         username: The username or email provided by the user
     """
-    session_data = get_session_data(session_id)
+    update_session_fields(session_id, "login_data", username=username.strip())
 
-    # Initialize login_data if not present
-    if "login_data" not in session_data:
-        session_data["login_data"] = {}
-
-    session_data["login_data"]["username"] = username.strip()
-    save_session_data(session_id, session_data)
-
-    print(f"✅ Stored login username: {username}")
+    logger.debug("✅ Stored login username: %s", username)
     return f"Username '{username}' saved. Now ask for their password."
 
 @tool
@@ -452,19 +535,41 @@ def get_login_password(session_id: str, password: str) -> str:
         session_id: The session ID
         password: The password provided by the user
     """
-    session_data = get_session_data(session_id)
-
-    # Initialize login_data if not present
-    if "login_data" not in session_data:
-        session_data["login_data"] = {}
-
     # Store the plain password temporarily (will be verified against hash in DB)
-    session_data["login_data"]["password"] = password
-    save_session_data(session_id, session_data)
+    update_session_fields(session_id, "login_data", password=password)
 
-    print(f"✅ Stored login password")
+    logger.debug("✅ Stored login password")
     return "Password saved. Now verify the credentials."
 
+# Short-lived cache of username/email -> (id, password hash, username) so retried logins
+# skip the DB. Misses are cached too, but only briefly so a fresh signup can log in.
+LOGIN_LOOKUP_TTL = 30
+LOGIN_LOOKUP_MISS_TTL = 5
+
+def _lookup_login_user(username: str):
+    """
+    Return (id, password, username) for a username or email, or None if no such user.
+    Cached entries are dropped by invalidate_login_lookup when a password is written.
+    """
+    username = username.strip()
+    cache_key = login_lookup_key(username)
+    cached = r.get(cache_key)
+    if cached is not None:
+        return orjson.loads(cached)
+
+    db = SessionLocal()
+    try:
+        # Only the columns login needs, not the whole User row
+        row = db.query(User).with_entities(User.id, User.password, User.username).filter(
+            (User.username == username) | (User.email == username)
+        ).first()
+    finally:
+        db.close()
+
+    user = tuple(row) if row else None
+    r.setex(cache_key, LOGIN_LOOKUP_TTL if user else LOGIN_LOOKUP_MISS_TTL, orjson.dumps(user))
+    return user
+
 @tool
 def verify_login_credentials(session_id: str) -> str:
     """
@@ -484,65 +589,60 @@ def verify_login_credentials(session_id: str) -> str:
     if not username or not password:
         return "Error: Missing username or password. Please provide both."
 
-    # Query database
-    db = SessionLocal()
     try:
-        # Try to find user by username OR email
-        user = db.query(User).filter(
-            (User.username == username) | (User.email == username)
-        ).first()
+        # Try to find user by username OR email (cached briefly in Redis)
+        user = _lookup_login_user(username)
 
         if not user:
-            print(f"❌ Login failed: User '{username}' not found")
+            logger.info("❌ Login failed: User '%s' not found", username)
             return "incorrect"
 
+        user_id, password_hash, user_username = user
+
         # Check if user has a password set
-        if not user.password:
-            print(f"❌ Login failed: User '{username}' has no password set")
+        if not password_hash:
+            logger.info("❌ Login failed: User '%s' has no password set", username)
             return "incorrect"
 
         # Check password - handle both bcrypt and Werkzeug formats
         password_valid = False
 
         # Try bcrypt format first (starts with $2b$ or $2a$ or $2y$)
-        if user.password.startswith('$2'):
+        if password_hash.startswith('$2'):
             try:
-                password_valid = bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8'))
+                password_valid = bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
             except Exception as bcrypt_error:
-                print(f"⚠️ bcrypt check failed: {bcrypt_error}")
+                logger.warning("⚠️ bcrypt check failed: %s", bcrypt_error)
 
         # Try Werkzeug format (starts with pbkdf2:)
-        elif user.password.startswith('pbkdf2:'):
+        elif password_hash.startswith('pbkdf2:'):
             try:
-                password_valid = check_password_hash(user.password, password)
+                password_valid = check_password_hash(password_hash, password)
             except Exception as werkzeug_error:
-                print(f"⚠️ Werkzeug check failed: {werkzeug_error}")
+                logger.warning("⚠️ Werkzeug check failed: %s", werkzeug_error)
 
         # Unknown format
         else:
-            print(f"⚠️ Unknown password hash format for user '{username}': {user.password[:20]}...")
+            logger.warning("⚠️ Unknown password hash format for user '%s'", username)
 
         if not password_valid:
-            print(f"❌ Login failed: Invalid password for '{username}'")
+            logger.info("❌ Login failed: Invalid password for '%s'", username)
             return "incorrect"
 
-        # SUCCESS! Store user_id in session
-        session_data["login_verified"] = True
-        session_data["verified_user_id"] = user.id
-
-        # Clear password from Redis for security
-        session_data["login_data"]["password"] = "[REDACTED]"
+        # SUCCESS! Store user_id in session, clearing the password from Redis for security
+        # Only the password field is overwritten, so login_data changes made since the
+        # read above aren't clobbered.
+        update_session(session_id, {
+            None: {"login_verified": True, "verified_user_id": user_id},
+            "login_data": {"password": "[REDACTED]"},
+        })
 
-        save_session_data(session_id, session_data)
-
-        print(f"✅ Login successful for user {user.username} (ID: {user.id})")
+        logger.info("✅ Login successful for user %s (ID: %s)", user_username, user_id)
         return "verified"
 
     except Exception as e:
-        print(f"❌ Database error during login: {str(e)}")
+        logger.error("❌ Database error during login: %s", e)
         return f"Error during login verification: {str(e)}"
-    finally:
-        db.close()
 
 @tool
 def finalize_login(session_id: str) -> str:
@@ -554,8 +654,6 @@ def finalize_login(session_id: str) -> str:
     Args:
         session_id: The session ID
     """
-    from utils.jwt_utils import create_access_token, create_refresh_token
-
     session_data = get_session_data(session_id)
 
     # Check if login was verified
@@ -572,20 +670,20 @@ def finalize_login(session_id: str) -> str:
         refresh_token = create_refresh_token(user_id)
 
         # Store in Redis session for polling
-        session_data["user_id"] = user_id
-        session_data["access_token"] = access_token
-        session_data["refresh_token"] = refresh_token
-
-        save_session_data(session_id, session_data)
+        update_session_fields(
+            session_id,
+            None,
+            user_id=user_id,
+            access_token=access_token,
+            refresh_token=refresh_token
+        )
 
-        print(f"✅ Login finalized for user {user_id}")
-        print(f"   Access token: {access_token[:20]}...")
-        print(f"   Refresh token: {refresh_token[:20]}...")
+        logger.info("✅ Login finalized for user %s", user_id)
 
         return "verified"
 
     except Exception as e:
-        print(f"❌ Error finalizing login: {str(e)}")
+        logger.error("❌ Error finalizing login: %s", e)
         return f"Error finalizing login: {str(e)}"
 
 
@@ -595,7 +693,11 @@ def delete_redis_key(session_id: str) -> str:
     This redis session_id of the onboarding conversation is deleted from redis.
     """
     if session_id:
-        r.delete(f"session:{session_id}")
+        # Also drop the cached login lookup (it holds a password hash) if this session logged in
+        login_username = r.hget(session_key(session_id, "login_data"), "username")
+        extra_keys = [login_lookup_key(login_username)] if login_username else []
+        # UNLINK frees the session in the background on the Redis side
+        delete_session(session_id, *extra_keys)
     else:
         return f"The session ID {session_id} has not been found."
 
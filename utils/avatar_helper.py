@@ -6,6 +6,19 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Get S3 base URL from environment variable (read once at import)
+# Format: https://your-bucket-name.s3.us-west-2.amazonaws.com
+BASE_URL = os.getenv("S3_AVATAR_BASE_URL", "https://glow-avatars-bucket.s3.us-west-1.amazonaws.com")
+
+# Avatar mapping: ethnicity -> female avatar image
+FEMALE_AVATARS = {
+    ethnicity: f"{BASE_URL}/female_{ethnicity.replace(' ', '_')}.png"
+    for ethnicity in ("asian", "black", "white", "hispanic", "middle eastern", "south asian")
+}
+
+# Fallback to white as default
+DEFAULT_AVATAR = FEMALE_AVATARS["white"]
+
 def get_cartoon_avatar(gender: str, ethnicity: str) -> str:
     """
     Map female user's ethnicity to a cartoon avatar image URL from S3.
@@ -18,24 +31,7 @@ def get_cartoon_avatar(gender: str, ethnicity: str) -> str:
     Returns:
         S3 URL to the cartoon avatar image for females
     """
-    # Get S3 base URL from environment variable
-    # Format: https://your-bucket-name.s3.us-west-2.amazonaws.com
-    BASE_URL = os.getenv("S3_AVATAR_BASE_URL", "https://glow-avatars-bucket.s3.us-west-1.amazonaws.com")
-
     # Normalize ethnicity to lowercase for consistent matching
     ethnicity = ethnicity.lower().strip() if ethnicity else "other"
 
-    # Avatar mapping: ethnicity -> female avatar image
-    female_avatars = {
-        "asian": f"{BASE_URL}/female_asian.png",
-        "black": f"{BASE_URL}/female_black.png",
-        "white": f"{BASE_URL}/female_white.png",
-        "hispanic": f"{BASE_URL}/female_hispanic.png",
-        "middle eastern": f"{BASE_URL}/female_middle_eastern.png",
-        "south asian": f"{BASE_URL}/female_south_asian.png",
-    }
-
-    # Get avatar for ethnicity or fallback to white as default
-    avatar_url = female_avatars.get(ethnicity, female_avatars["white"])
-
-    return avatar_url
+    return FEMALE_AVATARS.get(ethnicity, DEFAULT_AVATAR)
@@ -1,148 +1,139 @@
 import logging
-import json
-from utils.redis_client import r
+import re
+import time
+import orjson
+from functools import lru_cache
+from utils.redis_client import r_raw
+from utils.session_store import SESSION_TTL, session_key
 
 logger = logging.getLogger(__name__)
 
 
-def set_prompt(session_id: str) -> str:
+# Signup status lines, in prompt order: (signup_data field, line when present, line when
+# missing). "{v}" in a present line is replaced by the saved value; tools.py field names.
+_FIELDS = (
+    ("intent",
+     "✅ User chose to '{v}'. No need to ask again.",
+     "❌ User intent unknown. Ask if they want to SIGN UP or LOG IN first."),
+    ("session_id",
+     "✅ Redis session is already created. No need to call create_redis_session.",
+     "❌ Redis session is missing. Call create_redis_session tool first."),
+    ("name",
+     "✅ First name already saved as '{v}'. No need to ask again.",
+     "❌ First name is missing. Ask for first name and call get_user_first_name tool."),
+    ("desiredUsername",
+     "✅ Username already saved as '{v}'. No need to ask again.",
+     "❌ Username is missing. Ask for username and call set_username tool."),
+    ("password",
+     "✅ Password already set. No need to ask again.",
+     "❌ Password is missing. Ask for password and call set_password tool."),
+    ("confirmPassword",
+     "✅ Password already confirmed.",
+     "❌ Password confirmation pending. Ask user to confirm password and call confirm_password tool."),
+    ("email",
+     "✅ Email already saved as '{v}'. No need to ask again.",
+     "❌ Email is missing. Ask for email and call get_email tool."),
+    ("birthday",
+     "✅ Birthday already saved as '{v}'. (Optional field)",
+     "❌ Birthday is missing (optional). Ask if they want to share and call get_user_birthday tool."),
+    ("gender",
+     "✅ Gender already saved as '{v}'. (Optional field)",
+     "❌ Gender is missing (optional). Ask if they want to share and call get_user_gender tool."),
+    ("sexuality",
+     "✅ Sexuality already saved as '{v}'. (Optional field)",
+     "❌ Sexuality is missing (optional). Ask if they want to share and call get_user_sexuality tool."),
+    ("ethnicity",
+     "✅ Ethnicity already saved as '{v}'. (Optional field)",
+     "❌ Ethnicity is missing (optional). Ask if they want to share and call get_user_ethnicity tool."),
+    ("pronouns",
+     "✅ Pronouns already saved as '{v}'. (Optional field)",
+     "❌ Pronouns are missing (optional). Ask if they want to share and call get_user_pronouns tool."),
+    ("university",
+     "✅ University already saved as '{v}'. (Optional field)",
+     "❌ University is missing (optional). Ask if they're in/went to college and call get_user_university tool."),
+    ("college_major",
+     "✅ College major already saved as '{v}'. (Optional field)",
+     "❌ College major is missing (optional). Ask for major and call get_user_college_major tool."),
+    ("occupation",
+     "✅ Occupation already saved as '{v}'. (Optional field)",
+     "❌ Occupation is missing (optional). Ask for occupation and call get_user_occupation tool."),
+    ("verification_code_sent",
+     "✅ Verification code already sent.",
+     "❌ Verification code not sent yet. Call generate_verification_code when all required fields are complete."),
+)
+
+_FIELD_NAMES = tuple(key for key, _, _ in _FIELDS)
+
+# Bits of the filled-field mask (bit i = _FIELDS[i]) checked by _build_signup_prompt
+_REQUIRED_MASK = sum(
+    1 << _FIELD_NAMES.index(key)
+    for key in ("intent", "session_id", "name", "desiredUsername", "password", "confirmPassword", "email")
+)
+_CODE_SENT_BIT = 1 << _FIELD_NAMES.index("verification_code_sent")
+_INTENT_INDEX = _FIELD_NAMES.index("intent")
+
+# _FIELDS with each present line pre-split around "{v}" into (head, tail), so building a
+# line is a plain concatenation; tail is None for lines that don't show the value.
+_STATUS_TEMPLATES = tuple(
+    (head, tail if sep else None, missing)
+    for head, sep, tail, missing in (
+        (*present.partition("{v}"), missing) for _, present, missing in _FIELDS
+    )
+)
+
+# Creates the session if it's missing and reads only the fields either prompt needs, in one
+# round-trip: HMGETs on the top-level, login and signup hashes (see utils.session_store).
+# The reply is [0, {is_login, login_verified, user_id}, {username, password}, {one value
+# per ARGV signup field}]; top-level values are JSON, section values plain strings, and
+# missing fields come back as nil (None). A session that had to be created replies {1}.
+# It runs on the bytes client, so the JSON values go to orjson.loads without a str decode.
+_LOAD_PROMPT_STATE = r_raw.register_script("""
+if redis.call('HSETNX', KEYS[1], 'created_at', ARGV[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return {1}
+end
+return {
+    0,
+    redis.call('HMGET', KEYS[1], 'is_login', 'login_verified', 'user_id'),
+    redis.call('HMGET', KEYS[2], 'username', 'password'),
+    redis.call('HMGET', KEYS[3], unpack(ARGV, 3))
+}
+""")
+
+
+def _state_value(v):
+    """Empty values become None; anything else is shown the way an f-string would."""
+    if not v:
+        return None
+    return v if v.__class__ is str else str(v)
+
+
+def _load_prompt_state(session_id: str) -> tuple:
     """
-    Build a dynamic prompt that changes depending on what info already exists in the redis dictionary.
-    
-    Args:
-        session_id: The unique session identifier for this user conversation
-        
-    Returns:
-        The formatted system prompt string with dynamic field status
+    (created, is_login, login_verified, user_id, login username, login password, *one value
+    per _FIELD_NAMES entry from signup_data) for a session, creating it if it's missing.
     """
-    
-    try:
-        # Step 1: Check if the key exists in redis. If it does not exist, create that key in redis.
-        redis_key = f"session:{session_id}"
-        if r.exists(redis_key) == 0:
-            # Create the key in redis with an empty session object
-            empty_session = {"messages": [], "signup_data": {}}
-            r.set(redis_key, json.dumps(empty_session))
-            logger.info(f"Created new redis key: {redis_key}")
-        
-        # Step 2: Get the info/session object in redis. Convert the json to python dictionary
-        session_json = r.get(redis_key)
-        session_data = json.loads(session_json) if session_json else {"messages": [], "signup_data": {}}
-        user_info = session_data.get("signup_data", {})
-        logger.info(f"Current user info: {user_info}")
-
-        # ==== CHECK IF USER IS IN LOGIN MODE ====
-        if session_data.get("is_login"):
-            return build_login_prompt(session_id, session_data)
-
-        # Step 3: Figure out what info is missing/already there
-        
-        # User intent (signup or login)
-        if user_info.get("intent"):
-            intent_status = f"✅ User chose to '{user_info.get('intent')}'. No need to ask again."
-        else:
-            intent_status = "❌ User intent unknown. Ask if they want to SIGN UP or LOG IN first."
-        
-        # Session created
-        if user_info.get("session_id"):
-            session_status = "✅ Redis session is already created. No need to call create_redis_session."
-        else:
-            session_status = "❌ Redis session is missing. Call create_redis_session tool first."
-        
-        # First name (tools.py uses "name" not "first_name")
-        if user_info.get("name"):
-            first_name_status = f"✅ First name already saved as '{user_info.get('name')}'. No need to ask again."
-        else:
-            first_name_status = "❌ First name is missing. Ask for first name and call get_user_first_name tool."
-        
-        # Username (tools.py uses "desiredUsername")
-        if user_info.get("desiredUsername"):
-            username_status = f"✅ Username already saved as '{user_info.get('desiredUsername')}'. No need to ask again."
-        else:
-            username_status = "❌ Username is missing. Ask for username and call set_username tool."
-        
-        # Password (check if set, never reveal)
-        if user_info.get("password"):
-            password_status = "✅ Password already set. No need to ask again."
-        else:
-            password_status = "❌ Password is missing. Ask for password and call set_password tool."
-        
-        # Password confirmed (tools.py uses "confirmPassword")
-        if user_info.get("confirmPassword"):
-            password_confirm_status = "✅ Password already confirmed."
-        else:
-            password_confirm_status = "❌ Password confirmation pending. Ask user to confirm password and call confirm_password tool."
-        
-        # Email
-        if user_info.get("email"):
-            email_status = f"✅ Email already saved as '{user_info.get('email')}'. No need to ask again."
-        else:
-            email_status = "❌ Email is missing. Ask for email and call get_email tool."
-        
-        # Birthday (optional)
-        if user_info.get("birthday"):
-            birthday_status = f"✅ Birthday already saved as '{user_info.get('birthday')}'. (Optional field)"
-        else:
-            birthday_status = "❌ Birthday is missing (optional). Ask if they want to share and call get_user_birthday tool."
-        
-        # Gender (optional)
-        if user_info.get("gender"):
-            gender_status = f"✅ Gender already saved as '{user_info.get('gender')}'. (Optional field)"
-        else:
-            gender_status = "❌ Gender is missing (optional). Ask if they want to share and call get_user_gender tool."
-        
-        # Sexuality (optional)
-        if user_info.get("sexuality"):
-            sexuality_status = f"✅ Sexuality already saved as '{user_info.get('sexuality')}'. (Optional field)"
-        else:
-            sexuality_status = "❌ Sexuality is missing (optional). Ask if they want to share and call get_user_sexuality tool."
-        
-        # Ethnicity (optional)
-        if user_info.get("ethnicity"):
-            ethnicity_status = f"✅ Ethnicity already saved as '{user_info.get('ethnicity')}'. (Optional field)"
-        else:
-            ethnicity_status = "❌ Ethnicity is missing (optional). Ask if they want to share and call get_user_ethnicity tool."
-        
-        # Pronouns (optional)
-        if user_info.get("pronouns"):
-            pronouns_status = f"✅ Pronouns already saved as '{user_info.get('pronouns')}'. (Optional field)"
-        else:
-            pronouns_status = "❌ Pronouns are missing (optional). Ask if they want to share and call get_user_pronouns tool."
-        
-        # University (optional)
-        if user_info.get("university"):
-            university_status = f"✅ University already saved as '{user_info.get('university')}'. (Optional field)"
-        else:
-            university_status = "❌ University is missing (optional). Ask if they're in/went to college and call get_user_university tool."
-        
-        # College major (optional)
-        if user_info.get("college_major"):
-            major_status = f"✅ College major already saved as '{user_info.get('college_major')}'. (Optional field)"
-        else:
-            major_status = "❌ College major is missing (optional). Ask for major and call get_user_college_major tool."
-        
-        # Occupation (optional)
-        if user_info.get("occupation"):
-            occupation_status = f"✅ Occupation already saved as '{user_info.get('occupation')}'. (Optional field)"
-        else:
-            occupation_status = "❌ Occupation is missing (optional). Ask for occupation and call get_user_occupation tool."
-        
-        # Verification code sent
-        if user_info.get("verification_code_sent"):
-            verification_sent_status = "✅ Verification code already sent."
-        else:
-            verification_sent_status = "❌ Verification code not sent yet. Call generate_verification_code when all required fields are complete."
-        
-        # Check if all required fields are complete (using tools.py field names)
-        required_complete = (user_info.get("intent") == "signup" and
-                            user_info.get("session_id") and
-                            user_info.get("name") and
-                            user_info.get("desiredUsername") and
-                            user_info.get("password") and
-                            user_info.get("confirmPassword") and
-                            user_info.get("email"))
-
-        prompt = f"""You are an assistant that facilitates login/signup for the app "Glow".
+    reply = _LOAD_PROMPT_STATE(
+        keys=[session_key(session_id), session_key(session_id, "login_data"),
+              session_key(session_id, "signup_data")],
+        args=[int(time.time()), SESSION_TTL, *_FIELD_NAMES],
+    )
+    if reply[0]:
+        return _NEW_SESSION_STATE
+    _, top, login, signup = reply
+    return (
+        0,
+        *[_state_value(orjson.loads(v)) if v else None for v in top],
+        *[v.decode() if v else None for v in login],
+        *[v.decode() if v else None for v in signup],
+    )
+
+# The state of a brand-new session
+_NEW_SESSION_STATE = (1,) + (None,) * (5 + len(_FIELD_NAMES))
+
+# Static prompt text is built once at import; only the session id and the status lines
+# vary per call.
+_SIGNUP_PROMPT = """You are an assistant that facilitates login/signup for the app "Glow".
 
 You can use tools silently. Never announce that you are using a tool.
 Never mention anything related to database, redis, or storage to the user.
@@ -150,29 +141,14 @@ Never mention tools, APIs, or system processes.
 Your job is to collect information naturally through conversation, without sounding robotic.
 Keep everything friendly, casual, and conversational — like a real human friend.
 
-IMPORTANT: The session_id for all tools is: {session_id}
+IMPORTANT: The session_id for all tools is: %(session_id)s
 You MUST use this exact session_id when calling any signup-related tools.
 
 ---
 
 📊 Current Signup Status:
 
-{intent_status}
-{session_status}
-{first_name_status}
-{username_status}
-{password_status}
-{password_confirm_status}
-{email_status}
-{birthday_status}
-{gender_status}
-{sexuality_status}
-{ethnicity_status}
-{pronouns_status}
-{university_status}
-{major_status}
-{occupation_status}
-{verification_sent_status}
+%(status_block)s
 
 ---
 
@@ -203,7 +179,7 @@ You MUST use this exact session_id when calling any signup-related tools.
 
 3. **Only call tools for missing information** — if a field shows ✅, skip it entirely.
 
-4. **Always use the session_id: {session_id}** when calling tools.
+4. **Always use the session_id: %(session_id)s** when calling tools.
 
 5. **Wait for user responses before proceeding** to the next step.
 
@@ -296,9 +272,7 @@ If the user chooses to log in:
 ---
 """
 
-        # Add dynamic message for personality conversation phase
-        if required_complete and not user_info.get("verification_code_sent"):
-            prompt += """
+_PERSONALITY_PHASE_SUFFIX = """
 
 🎉 ALL REQUIRED FIELDS COLLECTED!
 
@@ -307,57 +281,7 @@ Do NOT send verification code yet. Get to know them first through natural conver
 Only after personality conversation is done, then send verification code (step 10).
 """
 
-        logger.info(f"Generated dynamic prompt for session {session_id}")
-        return prompt
-
-    except Exception as e:
-        logger.error(f"Error in set_prompt: {str(e)}")
-        return f"""You are an assistant for the app "Glow".
-Session ID: {session_id}.
-There was an error loading user data. Please ask the user to try again or contact support."""
-
-
-def build_login_prompt(session_id: str, session_data: dict) -> str:
-    """
-    Build a dynamic prompt for login mode.
-
-    Args:
-        session_id: The session ID
-        session_data: The full session data from Redis
-
-    Returns:
-        The formatted login prompt
-    """
-    login_data = session_data.get("login_data", {})
-
-    # Check status of login fields
-    has_username = bool(login_data.get("username"))
-    has_password = bool(login_data.get("password"))
-    login_verified = session_data.get("login_verified", False)
-    user_id = session_data.get("user_id")
-
-    # Build status messages
-    if has_username:
-        username_status = f"✅ Username/email saved: '{login_data.get('username')}'"
-    else:
-        username_status = "❌ Username/email not provided yet"
-
-    if has_password:
-        password_status = "✅ Password saved"
-    else:
-        password_status = "❌ Password not provided yet"
-
-    if login_verified:
-        verification_status = "✅ Credentials verified successfully"
-    else:
-        verification_status = "❌ Credentials not verified yet"
-
-    if user_id:
-        finalization_status = "✅ Login finalized, user_id and tokens generated"
-    else:
-        finalization_status = "❌ Login not finalized yet"
-
-    prompt = f"""You are an assistant that facilitates login for the app "Glow".
+_LOGIN_PROMPT = """You are an assistant that facilitates login for the app "Glow".
 
 You can use tools silently. Never announce that you are using a tool.
 Never mention anything related to database, redis, or storage to the user.
@@ -365,17 +289,14 @@ Never mention tools, APIs, or system processes.
 Your job is to help users log in naturally through conversation, without sounding robotic.
 Keep everything friendly, casual, and conversational — like a real human friend.
 
-IMPORTANT: The session_id for all tools is: {session_id}
+IMPORTANT: The session_id for all tools is: %(session_id)s
 You MUST use this exact session_id when calling any login-related tools.
 
 ---
 
 📊 Current Login Status:
 
-{username_status}
-{password_status}
-{verification_status}
-{finalization_status}
+%(status_block)s
 
 ---
 
@@ -410,6 +331,165 @@ You MUST use this exact session_id when calling any login-related tools.
 ---
 """
 
-    logger.info(f"Generated login prompt for session {session_id}")
-    return prompt
+# The same templates pre-split around their placeholders, so a prompt is assembled with a
+# single "".join of static chunks and the per-call values.
+_SIGNUP_CHUNKS = tuple(re.split(r"%\((?:session_id|status_block)\)s", _SIGNUP_PROMPT))  # sid, status, sid
+_LOGIN_CHUNKS = tuple(re.split(r"%\((?:session_id|status_block)\)s", _LOGIN_PROMPT))  # sid, status
+
+
+def set_prompt(session_id: str) -> str:
+    """
+    Build a dynamic prompt that changes depending on what info already exists in the redis dictionary.
+    
+    Args:
+        session_id: The unique session identifier for this user conversation
+        
+    Returns:
+        The formatted system prompt string with dynamic field status
+    """
+    
+    try:
+        # Step 1: Create the session in redis if it does not exist, and get back only the
+        # fields the prompt needs.
+        state = _load_prompt_state(session_id)
+        if state[0]:
+            logger.info("Created new redis session: %s", session_id)
+        (_, is_login, login_verified, user_id,
+         login_username, login_password, *values) = state
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Current user info: %s", dict(zip(_FIELD_NAMES, values)))
+
+        # ==== CHECK IF USER IS IN LOGIN MODE ====
+        # One read above feeds either builder directly; neither goes back to Redis
+        if is_login:
+            prompt = _build_login_prompt(
+                session_id, login_username, bool(login_password), bool(login_verified), bool(user_id)
+            )
+        else:
+            prompt = _build_signup_prompt(session_id, tuple(values))
+
+        logger.info("Generated %s prompt for session %s", "login" if is_login else "dynamic", session_id)
+        return prompt
+
+    except Exception as e:
+        logger.error("Error in set_prompt: %s", e)
+        return f"""You are an assistant for the app "Glow".
+Session ID: {session_id}.
+There was an error loading user data. Please ask the user to try again or contact support."""
+
+
+@lru_cache(maxsize=4096)
+def _signup_template(mask: int) -> tuple:
+    """
+    The signup prompt for one combination of filled fields (bit i set = _FIELDS[i] has a
+    value), shared by every session in that state. Static text is merged into as few
+    strings as possible; an int part is a slot: values[i], or the session id for -1.
+    """
+    c0, c1, c2, c3 = _SIGNUP_CHUNKS
+    parts = [c0, -1, c1]
+    for i, (head, tail, missing) in enumerate(_STATUS_TEMPLATES):
+        if i:
+            parts.append("\n")
+        if not mask >> i & 1:
+            parts.append(missing)
+        elif tail is None:
+            parts.append(head)
+        else:
+            parts += [head, i, tail]
+    parts += [c2, -1, c3]
+
+    merged = []
+    for part in parts:
+        if part.__class__ is str and merged and merged[-1].__class__ is str:
+            merged[-1] += part
+        else:
+            merged.append(part)
+    return tuple(merged)
+
+
+@lru_cache(maxsize=2048)
+def _build_signup_prompt(session_id: str, values: tuple) -> str:
+    """
+    Build the signup prompt from the signup_data values (in _FIELDS order).
+    The output depends only on the arguments, so repeat builds within a turn (tool loop,
+    retries) are cache hits; any changed field is a different key and misses naturally.
+    """
+    # Figure out what info is missing/already there: which fields are filled picks the
+    # (shared, cached) template, and only the saved values that are shown get slotted in
+    mask = 0
+    for i, v in enumerate(values):
+        if v:
+            mask |= 1 << i
+
+    # Check if all required fields are complete, reusing the mask: only intent's value matters
+    required_complete = mask & _REQUIRED_MASK == _REQUIRED_MASK and values[_INTENT_INDEX] == "signup"
+
+    parts = [
+        part if part.__class__ is str else (values[part] if part >= 0 else session_id)
+        for part in _signup_template(mask)
+    ]
+
+    # Add dynamic message for personality conversation phase (as one more part, so the
+    # prompt is still written out once rather than copied again to append it)
+    if required_complete and not mask & _CODE_SENT_BIT:
+        parts.append(_PERSONALITY_PHASE_SUFFIX)
+
+    return "".join(parts)
+
+
+def build_login_prompt(session_id: str, session_data: dict, login_data: dict = None) -> str:
+    """
+    Build a dynamic prompt for login mode from an already-loaded session.
+    set_prompt doesn't go through here; it feeds _build_login_prompt straight from its read.
+
+    Args:
+        session_id: The session ID
+        session_data: The full session data from Redis
+        login_data: session_data["login_data"], if the caller has already pulled it out
+
+    Returns:
+        The formatted login prompt
+    """
+    if login_data is None:
+        login_data = session_data.get("login_data") or {}
+
+    return _build_login_prompt(
+        session_id,
+        login_data.get("username") or None,
+        bool(login_data.get("password")),
+        bool(session_data.get("login_verified", False)),
+        bool(session_data.get("user_id"))
+    )
+
+
+@lru_cache(maxsize=2048)
+def _build_login_prompt(session_id: str, username, has_password: bool, login_verified: bool, finalized: bool) -> str:
+    """Build the login prompt; cached like _build_signup_prompt since it depends only on its arguments."""
+    # Build status messages
+    if username:
+        username_status = f"✅ Username/email saved: '{username}'"
+    else:
+        username_status = "❌ Username/email not provided yet"
+
+    if has_password:
+        password_status = "✅ Password saved"
+    else:
+        password_status = "❌ Password not provided yet"
+
+    if login_verified:
+        verification_status = "✅ Credentials verified successfully"
+    else:
+        verification_status = "❌ Credentials not verified yet"
+
+    if finalized:
+        finalization_status = "✅ Login finalized, user_id and tokens generated"
+    else:
+        finalization_status = "❌ Login not finalized yet"
 
+    c0, c1, c2 = _LOGIN_CHUNKS
+    return "".join((
+        c0, session_id, c1,
+        username_status, "\n", password_status, "\n", verification_status, "\n", finalization_status,
+        c2
+    ))
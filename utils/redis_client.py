@@ -3,8 +3,64 @@ import os, redis
 
 REDIS_URL = "redis://localhost:6379"
 
+# Shared connection pool so concurrent workers/threads each get their own socket instead of
+# queueing on one. Size it to roughly workers x threads; callers block (up to timeout seconds)
+# for a free connection rather than erroring when the pool is exhausted.
+pool = redis.BlockingConnectionPool(
+    host='localhost',
+    port=6379,
+    decode_responses=True,
+    max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "64")),
+    timeout=5,
+    socket_keepalive=True,
+    health_check_interval=30
+)
+
 # Redis connection
-r = redis.Redis(host='localhost', port=6379, decode_responses=True)
+r = redis.Redis(connection_pool=pool)
+
+# Same server, but replies stay bytes. For reads whose values go straight to orjson.loads
+# (which takes bytes), so they aren't UTF-8 decoded into a str first.
+raw_pool = redis.BlockingConnectionPool(
+    host='localhost',
+    port=6379,
+    decode_responses=False,
+    max_connections=int(os.getenv("REDIS_RAW_MAX_CONNECTIONS", "16")),
+    timeout=5,
+    socket_keepalive=True,
+    health_check_interval=30
+)
+r_raw = redis.Redis(connection_pool=raw_pool)
+
+def warm_pool(count: int = int(os.getenv("REDIS_WARM_CONNECTIONS", "8"))):
+    """
+    Open `count` pooled connections up front (at app startup) so the first requests after a
+    deploy don't each pay a TCP connect + handshake on the hot path.
+    """
+    for warm in (pool, raw_pool):
+        connections = []
+        try:
+            for _ in range(min(count, warm.max_connections)):
+                connections.append(warm.get_connection("PING"))
+        finally:
+            for connection in connections:
+                warm.release(connection)
+
+def login_lookup_key(identifier: str) -> str:
+    """
+    Redis key for the cached login lookup of a username or email. Surrounding whitespace is
+    stripped; case is kept because the users lookup is an exact match on username/email.
+    """
+    return f"userlookup:{identifier.strip()}"
+
+def invalidate_login_lookup(*identifiers):
+    """
+    Drop the cached login lookups for a user's username and email. Call this wherever a
+    user's password is written (or a user is created), so a stale hash or "no such user"
+    isn't served for the rest of the cache TTL.
+    """
+    keys = [login_lookup_key(identifier) for identifier in identifiers if identifier]
+    if keys:
+        r.unlink(*keys)
 # r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
 print(f"Connecting to Redis at {r}")
-
@@ -0,0 +1,130 @@
+"""
+Signup/login session storage in Redis.
+
+A session is three hashes that expire together:
+    session:{id}          top-level fields (is_login, login_verified, user_id, tokens, ...)
+    session:{id}:signup   signup_data fields
+    session:{id}:login    login_data fields
+
+Setters HSET only the fields they change, in one MULTI/EXEC round-trip that also refreshes
+the TTL of all three keys, so two tools updating the same session can't overwrite each
+other and nothing else in the session is re-sent. signup/login values are plain strings;
+top-level values are JSON-encoded because they include flags and the first feed group.
+The top-level hash always holds created_at, so it exists for as long as the session does.
+"""
+import time
+import orjson
+from typing import Optional
+from utils.redis_client import r
+
+SESSION_TTL = 1800  # seconds
+
+# Key suffix for each session section; None is the top-level hash
+_SECTION_SUFFIXES = {None: "", "signup_data": ":signup", "login_data": ":login"}
+
+
+def session_key(session_id: str, section: Optional[str] = None) -> str:
+    """Redis key of one section of a session ("signup_data", "login_data" or None)."""
+    return f"session:{session_id}{_SECTION_SUFFIXES[section]}"
+
+
+def session_keys(session_id: str) -> tuple:
+    """Every key that makes up a session."""
+    return tuple(session_key(session_id, section) for section in _SECTION_SUFFIXES)
+
+
+def _encode_fields(section: Optional[str], fields: dict) -> dict:
+    if section is None:
+        return {name: orjson.dumps(value) for name, value in fields.items()}
+    return fields
+
+
+def _start(pipe, session_id: str):
+    # Makes sure the top-level hash exists, so the session is found even if only a
+    # section has been written
+    pipe.hsetnx(session_key(session_id), "created_at", int(time.time()))
+
+
+def _expire(pipe, session_id: str, ttl: int):
+    for key in session_keys(session_id):
+        pipe.expire(key, ttl)
+
+
+def session_exists(session_id: str) -> bool:
+    return bool(r.exists(session_key(session_id)))
+
+
+def load_session(session_id: str) -> Optional[dict]:
+    """
+    Read a whole session in one round-trip, or None if it doesn't exist.
+    Returns the top-level fields plus "signup_data" and "login_data" dicts.
+    """
+    pipe = r.pipeline()
+    for key in session_keys(session_id):
+        pipe.hgetall(key)
+    top, signup_data, login_data = pipe.execute()
+    if not top:
+        return None
+
+    session = {name: orjson.loads(value) for name, value in top.items()}
+    session["signup_data"] = signup_data
+    session["login_data"] = login_data
+    return session
+
+
+def create_session(session_id: str) -> bool:
+    """Create an empty session if there isn't one. Returns True if it was created."""
+    pipe = r.pipeline()
+    _start(pipe, session_id)
+    _expire(pipe, session_id, SESSION_TTL)
+    return bool(pipe.execute()[0])
+
+
+def update_session(session_id: str, updates: dict, clear: tuple = (), ttl: int = SESSION_TTL):
+    """
+    Set fields in one or more sections atomically, e.g.
+    {None: {"login_verified": True}, "login_data": {"password": "[REDACTED]"}}.
+    Sections named in `clear` are emptied first.
+    """
+    pipe = r.pipeline()
+    _start(pipe, session_id)
+    for section in clear:
+        pipe.delete(session_key(session_id, section))
+    for section, fields in updates.items():
+        if fields:
+            pipe.hset(session_key(session_id, section), mapping=_encode_fields(section, fields))
+    _expire(pipe, session_id, ttl)
+    pipe.execute()
+
+
+def set_field_if_absent(session_id: str, section: str, field: str, value):
+    """
+    Atomically set a section field only if it has no value yet (HSETNX).
+    Returns the value already stored (and writes nothing), or None if `value` was stored.
+    """
+    pipe = r.pipeline()
+    _start(pipe, session_id)
+    pipe.hsetnx(session_key(session_id, section), field, value)
+    pipe.hget(session_key(session_id, section), field)
+    _expire(pipe, session_id, SESSION_TTL)
+    _, stored, current = pipe.execute()[:3]
+    return None if stored else current
+
+
+# HDEL a field only if it still holds the expected value
+_DELETE_FIELD_IF_EQUAL = r.register_script("""
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+""")
+
+
+def delete_field_if_equal(session_id: str, section: str, field: str, value) -> bool:
+    """Delete a section field if it still holds `value`. Returns True if it was deleted."""
+    return bool(_DELETE_FIELD_IF_EQUAL(keys=[session_key(session_id, section)], args=[field, value]))
+
+
+def delete_session(session_id: str, *extra_keys):
+    """UNLINK every key of a session (plus any extra keys) in one command."""
+    r.unlink(*session_keys(session_id), *extra_keys)